@@ -0,0 +1,220 @@
+import sys
+import time
+import calendar
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from bank import money, cache, lock_accounts, SET_BALANCE
+from pool import ConnectionPool
+
+# ------------------------------------------------------------
+# SCHEDULE
+# ------------------------------------------------------------
+def add_months(date, months, day=None):
+    #day is the day of month the schedule is anchored on (the first TransferDate's); clamping only applies
+    #to the month computed, so Jan 31 -> Feb 28 -> Mar 31 and Feb 29 -> Feb 28 -> ... -> Feb 29
+    month = date.month - 1 + months
+    year = date.year + month // 12
+    month = month % 12 + 1
+    day = min(day or date.day, calendar.monthrange(year, month)[1])
+    return date.replace(year=year, month=month, day=day)
+
+FREQUENCIES = {
+    "daily": lambda d, day: d + timedelta(days=1),
+    "weekly": lambda d, day: d + timedelta(weeks=1),
+    "monthly": lambda d, day: add_months(d, 1, day),
+    "quarterly": lambda d, day: add_months(d, 3, day),
+    "yearly": lambda d, day: add_months(d, 12, day),
+    "annually": lambda d, day: add_months(d, 12, day),
+}
+
+def next_transfer_date(date, frequency, day=None):
+    step = FREQUENCIES.get((frequency or "").strip().lower())
+    if step is None:
+        raise Exception(f"Unknown frequency: {frequency}")
+    return step(date, day)
+
+# ------------------------------------------------------------
+# DUE AUTOTRANSFERS
+# ------------------------------------------------------------
+FIRST_DUE = """
+    SELECT AutoTransferID, TransferDate
+    FROM autotransfer
+    WHERE TransferDate <= %s
+    ORDER BY TransferDate, AutoTransferID
+    LIMIT %s
+"""
+DUE_AFTER = """
+    SELECT AutoTransferID, TransferDate
+    FROM autotransfer
+    WHERE TransferDate <= %s
+      AND (TransferDate > %s OR (TransferDate = %s AND AutoTransferID > %s))
+    ORDER BY TransferDate, AutoTransferID
+    LIMIT %s
+"""
+
+def find_due(conn, now, after=None, limit=500):
+    #keyset page over (TransferDate, AutoTransferID), served by the TransferDate index
+    with conn.cursor() as cur:
+        if after is None:
+            cur.execute(FIRST_DUE, (now, limit))
+        else:
+            last_date, last_id = after
+            cur.execute(DUE_AFTER, (now, last_date, last_date, last_id, limit))
+        return cur.fetchall()
+
+LOCK_DUE = """
+    SELECT AutoTransferID, SourceAccountID, TargetAccountID, Amount, Frequency, TransferDate, DayOfMonth
+    FROM autotransfer
+    WHERE AutoTransferID IN ({marks}) AND TransferDate <= %s
+    ORDER BY AutoTransferID
+    FOR UPDATE
+"""
+ADVANCE = "UPDATE autotransfer SET TransferDate=%s WHERE AutoTransferID=%s"
+
+def run_batch(conn, autotransfer_ids, now):
+    #one DB transaction per batch; returns (executed, skipped)
+    #locks autotransfer rows, then account rows, both in ascending id order like transfer() sorts a1, a2,
+    #so concurrent batches can wait on each other but never deadlock
+    ids = sorted(autotransfer_ids)
+    marks = ",".join(["%s"]*len(ids))
+    try:
+        with conn.cursor() as cur:
+            conn.begin()
+
+            #re-read under lock: another run may already have advanced some of them
+            cur.execute(LOCK_DUE.format(marks=marks), (*ids, now))
+            due = sorted(cur.fetchall(), key=lambda r: (r['TransferDate'], r['AutoTransferID']))
+            if not due:
+                conn.commit()
+                return 0, 0
+
+            accounts = sorted({r['SourceAccountID'] for r in due} | {r['TargetAccountID'] for r in due})
+            bal = lock_accounts(cur, accounts)
+
+            transactions = []
+            advances = []
+            skipped = 0
+            for r in due:
+                source, target, amount = r['SourceAccountID'], r['TargetAccountID'], money(r['Amount'])
+                try:
+                    next_date = next_transfer_date(r['TransferDate'], r['Frequency'], r['DayOfMonth'])
+                except Exception:
+                    skipped += 1
+                    continue
+                if source not in bal or target not in bal or bal[source] < amount:
+                    skipped += 1 #stays due, retried on the next run
+                    continue
+                bal[source] -= amount
+                bal[target] += amount
+                transactions.append((source, target, amount, f"AutoTransfer #{r['AutoTransferID']}"))
+                advances.append((next_date, r['AutoTransferID']))
+
+            if transactions:
+                touched = {t[0] for t in transactions} | {t[1] for t in transactions}
+                cur.executemany(SET_BALANCE, [(bal[a], a) for a in sorted(touched)])
+                cur.executemany("""
+                    INSERT INTO transaction
+                    (SourceAccountID, RecipientAccountID, Type, Amount, Description)
+                    VALUES (%s, %s, 'Transfer', %s, %s)
+                """, transactions)
+                cur.executemany(ADVANCE, advances)
+
+            conn.commit()
+            for source, target, _, _ in transactions:
+                cache.invalidate_account(source) #balances and the advanced TransferDate
+                cache.invalidate_account(target, "accounts")
+            return len(transactions), skipped
+    except Exception:
+        conn.rollback()
+        raise
+
+# ------------------------------------------------------------
+# ENGINE
+# ------------------------------------------------------------
+class RunStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.failed_batches = 0
+        self.executed = 0
+        self.skipped = 0
+        self.failed = 0 #autotransfers in failed batches, still due
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, executed, skipped):
+        with self.lock:
+            self.batches += 1
+            self.executed += executed
+            self.skipped += skipped
+
+    def fail(self, size):
+        with self.lock:
+            self.failed_batches += 1
+            self.failed += size
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def per_second(self):
+        return self.executed / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"executed {self.executed}, skipped {self.skipped}, failed {self.failed} "
+                f"in {self.batches + self.failed_batches} batches ({self.failed_batches} failed), "
+                f"{self.elapsed:.2f}s, {self.per_second():.1f} transfers/s")
+
+def run_due(pool, now=None, workers=4, batch_size=200):
+    #pages through due autotransfers and hands each page to a worker as one batch
+    now = now or datetime.now()
+    stats = RunStats()
+    seen = set() #rows advanced to a date still <= now come back in later pages; run them next time
+
+    def work(ids):
+        try:
+            with pool.connection() as conn:
+                stats.add(*run_batch(conn, ids, now))
+        except Exception as e:
+            stats.fail(len(ids))
+            print("AutoTransfer batch failed:", e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor, pool.connection() as conn:
+        after = None
+        pending = []
+        while True:
+            rows = find_due(conn, now, after, batch_size)
+            conn.commit() #fresh snapshot for the next page
+            if not rows:
+                break
+            after = (rows[-1]['TransferDate'], rows[-1]['AutoTransferID'])
+            ids = [r['AutoTransferID'] for r in rows if r['AutoTransferID'] not in seen]
+            seen.update(ids)
+            if ids:
+                pending.append(executor.submit(work, ids))
+            if len(pending) >= workers*2: #bounded number of batches in flight
+                pending.pop(0).result()
+        for f in pending:
+            f.result()
+
+    stats.finish()
+    return stats
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def main(): #python autotransfer.py [workers] [batch_size]
+    args = sys.argv
+    workers = int(args[1]) if len(args) > 1 else 4
+    batch_size = int(args[2]) if len(args) > 2 else 200
+
+    pool = ConnectionPool(size=workers+1)
+    try:
+        stats = run_due(pool, workers=workers, batch_size=batch_size)
+        print("AutoTransfer run:", stats.summary())
+    finally:
+        pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import pymysql
+from pymysql.constants import CLIENT
 from getpass import getpass
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime
 
+from cache import ResultCache
+from search import index_user, search_users, SEARCH_LIMIT
+
 # ------------------------------------------------------------
 # OTHERS
 # ------------------------------------------------------------
@@ -15,6 +19,16 @@ DB_CONFIG = {
     "autocommit": False
 }
 
+#same server, but lets one execute() carry several ;-separated statements (withdraw_fast_tx/deposit_fast_tx batching)
+MULTI_DB_CONFIG = dict(DB_CONFIG, client_flag=CLIENT.MULTI_STATEMENTS)
+
+PAGE_SIZE = 100 #rows per page for list_all_* paging
+
+CLOSED = 'Closed' #account.Status of a deleted account whose ledger is waiting for purge.py
+
+#read-through cache for per-user lists and the admin name lookup, dropped by the writes below
+cache = ResultCache(maxsize=1024, ttl=60)
+
 def money(x):
     return Decimal(x).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
@@ -24,112 +38,157 @@ def connect():
 # ------------------------------------------------------------
 # USER CREATION
 # ------------------------------------------------------------
+def create_user_tx(conn, fname, minit, lname, birthday, email, password, phone): #raises on failure, returns the UserID
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO user (FName, Minit, LName, Birthday, Email, Password, PhoneNumber)
+                VALUES (%s,%s,%s,%s,%s,%s,%s)
+            """, (fname, minit, lname, birthday, email, password, phone))
+            user_id = cur.lastrowid
+            index_user(cur, user_id, fname, lname, email) #search trigrams, same transaction as the user row
+        conn.commit()
+        return user_id
+    except Exception:
+        conn.rollback()
+        raise
+
 def create_user(conn, fname, minit, lname, birthday, email, password, phone):
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO user (FName, Minit, LName, Birthday, Email, Password, PhoneNumber)
-            VALUES (%s,%s,%s,%s,%s,%s,%s)
-        """, (fname, minit, lname, birthday, email, password, phone))
-    conn.commit()
-    print("User successfully created!")
+    try:
+        user_id = create_user_tx(conn, fname, minit, lname, birthday, email, password, phone)
+        print("User successfully created!")
+        return user_id
+    except Exception as e:
+        print("Sign up failed:", e)
+        return None
 
 # ------------------------------------------------------------
 # USER/ADMIN LOGIN
 # ------------------------------------------------------------
+FIND_USER = "SELECT * FROM user WHERE Email=%s AND Password=%s"
+FIND_ADMIN = "SELECT * FROM admin WHERE Email=%s AND Password=%s"
+
+def find_user(conn, email, password):
+    with conn.cursor() as cur:
+        cur.execute(FIND_USER, (email, password))
+        return cur.fetchone()
+
+def find_admin(conn, email, password):
+    with conn.cursor() as cur:
+        cur.execute(FIND_ADMIN, (email, password))
+        return cur.fetchone()
+
 def user_login(conn):
     print("\n=== USER LOGIN ===")
     email = input("Email: ").strip()
     password = getpass("Password: ")
 
-    with conn.cursor() as cur:
-        cur.execute("SELECT * FROM user WHERE Email=%s AND Password=%s",(email, password))
-        row = cur.fetchone()
-        if row:
-            print(f"Welcome, {row['FName']}!")
-            return row
-        print("Invalid email or password.")
-        return None
+    row = find_user(conn, email, password)
+    if row:
+        print(f"Welcome, {row['FName']}!")
+        return row
+    print("Invalid email or password.")
+    return None
 
 def admin_login(conn):
     print("\n=== ADMIN LOGIN ===")
     email = input("Email: ").strip()
     password = getpass("Password: ")
 
-    with conn.cursor() as cur:
-        cur.execute("SELECT * FROM admin WHERE Email=%s AND Password=%s", (email, password))
-        row = cur.fetchone()
-        if row:
-            print(f"Admin logged in: {row['FName']}")
-            return row
-        print("Invalid admin credentials.")
-        return None
+    row = find_admin(conn, email, password)
+    if row:
+        print(f"Admin logged in: {row['FName']}")
+        return row
+    print("Invalid admin credentials.")
+    return None
 
 # ------------------------------------------------------------
 # ACCOUNT MANAGEMENT
 # ------------------------------------------------------------
 
+def create_account_tx(conn, user_id, init_balance, admin_id, account_type): #raises on failure, returns the AccountID
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO account (UserID, AdminID, Balance, AccountType)
+                VALUES (%s, %s, %s, %s)
+            """, (user_id, admin_id, init_balance, account_type))
+            account_id = cur.lastrowid
+
+        conn.commit()
+        cache.invalidate(("accounts", user_id))
+        return account_id
+    except Exception:
+        conn.rollback()
+        raise
+
 def create_account(conn, user_id, init_balance, admin_id, account_type):
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO account (UserID, AdminID, Balance, AccountType)
-            VALUES (%s, %s, %s, %s)
-        """, (user_id, admin_id, init_balance, account_type))
+    try:
+        account_id = create_account_tx(conn, user_id, init_balance, admin_id, account_type)
+        print("Account successfully created.")
+        return account_id
+    except Exception as e:
+        print("Account creation failed:", e)
+        return None
 
-    conn.commit()
-    print("Account successfully created.")
+LOCK_OWNED_ACCOUNT = """
+    SELECT AccountID FROM account
+    WHERE AccountID=%s AND UserID=%s AND Status<>%s
+    FOR UPDATE
+"""
+CLOSE_ACCOUNT = "UPDATE account SET Status=%s WHERE AccountID=%s"
 
-def delete_account(conn, account_id, user_id):
+def delete_account_tx(conn, account_id, user_id): #raises on failure
     try:
         with conn.cursor() as cur:
             conn.begin()
 
             #check if the user inputed proper account num (that belongs to them)
-            cur.execute("""
-                SELECT AccountID FROM account
-                WHERE AccountID=%s AND UserID=%s
-            """, (account_id, user_id))
+            cur.execute(LOCK_OWNED_ACCOUNT, (account_id, user_id, CLOSED))
             if not cur.fetchone():
                 raise Exception("You do not own this account.")
 
-            #delete transactions
-            cur.execute("""
-                DELETE FROM transaction
-                WHERE SourceAccountID=%s OR RecipientAccountID=%s
-            """, (account_id, account_id))
-
-            #delete autotransfers
-            cur.execute("""
-                DELETE FROM autotransfer
-                WHERE SourceAccountID=%s OR TargetAccountID=%s
-            """, (account_id, account_id))
-
-            #delete account
-            cur.execute("DELETE FROM account WHERE AccountID=%s", (account_id,))
+            #close now; transactions, autotransfers and the row itself are deleted in chunks by purge.py
+            cur.execute(CLOSE_ACCOUNT, (CLOSED, account_id))
 
             conn.commit()
-            print("Account successfully deleted.")
+            cache.invalidate(("accounts", user_id))
+            cache.invalidate_account(account_id)
+    except Exception:
+        conn.rollback()
+        raise
 
+def delete_account(conn, account_id, user_id):
+    try:
+        delete_account_tx(conn, account_id, user_id)
+        print("Account successfully deleted. Its history will be purged in the background.")
+        return True
     except Exception as e:
-        conn.rollback()
         print("Delete failed:", e)
+        return False
 
 # ------------------------------------------------------------
 # TRANSACTIONS (Deposit, Withdraw, Transfer)
 # ------------------------------------------------------------
-def deposit(conn, source_id, amount, desc=None):
+LOCK_ACCOUNT = "SELECT Balance, Status FROM account WHERE AccountID=%s FOR UPDATE"
+SET_BALANCE = "UPDATE account SET Balance=%s WHERE AccountID=%s"
+
+def deposit_tx(conn, source_id, amount, desc=None): #raises on failure, returns the new balance
     amount = money(amount)
     try:
         with conn.cursor() as cur:
             conn.begin()
 
-            cur.execute("SELECT Balance FROM account WHERE AccountID=%s FOR UPDATE", (source_id,))
+            cur.execute(LOCK_ACCOUNT, (source_id,))
             row = cur.fetchone()
             if not row:
                 raise Exception("Account not found.")
+            if row['Status'] == CLOSED:
+                raise Exception("Account is closed.")
 
             new_balance = money(row['Balance']) + amount
 
-            cur.execute("UPDATE account SET Balance=%s WHERE AccountID=%s", (new_balance, source_id))
+            cur.execute(SET_BALANCE, (new_balance, source_id))
 
             cur.execute("""
                 INSERT INTO transaction
@@ -138,28 +197,40 @@ def deposit(conn, source_id, amount, desc=None):
             """, (source_id, amount, desc))
 
             conn.commit()
-            print("Deposit successful. New balance:", new_balance)
-    except Exception as e:
+            cache.invalidate_account(source_id, "accounts")
+            return new_balance
+    except Exception:
         conn.rollback()
+        raise
+
+def deposit(conn, source_id, amount, desc=None):
+    try:
+        new_balance = deposit_tx(conn, source_id, amount, desc)
+        print("Deposit successful. New balance:", new_balance)
+        return new_balance
+    except Exception as e:
         print("Deposit failed:", e)
+        return None
 
-def withdraw(conn, source_id, amount, desc=None):
+def withdraw_tx(conn, source_id, amount, desc=None): #raises on failure, returns the new balance
     amount = money(amount)
     try:
         with conn.cursor() as cur:
             conn.begin()
 
-            cur.execute("SELECT Balance FROM account WHERE AccountID=%s FOR UPDATE", (source_id,))
+            cur.execute(LOCK_ACCOUNT, (source_id,))
             row = cur.fetchone()
             if not row:
                 raise Exception("Account not found.")
+            if row['Status'] == CLOSED:
+                raise Exception("Account is closed.")
 
             if money(row['Balance']) < amount:
                 raise Exception("Insufficient funds.")
 
             new_balance = money(row['Balance']) - amount
 
-            cur.execute("UPDATE account SET Balance=%s WHERE AccountID=%s",(new_balance, source_id))
+            cur.execute(SET_BALANCE, (new_balance, source_id))
 
             cur.execute("""
                 INSERT INTO transaction
@@ -168,27 +239,41 @@ def withdraw(conn, source_id, amount, desc=None):
             """, (source_id, amount, desc))
 
             conn.commit()
-            print("Withdraw successful. New balance:", new_balance)
-    except Exception as e:
+            cache.invalidate_account(source_id, "accounts")
+            return new_balance
+    except Exception:
         conn.rollback()
+        raise
+
+def withdraw(conn, source_id, amount, desc=None):
+    try:
+        new_balance = withdraw_tx(conn, source_id, amount, desc)
+        print("Withdraw successful. New balance:", new_balance)
+        return new_balance
+    except Exception as e:
         print("Withdraw failed:", e)
+        return None
 
-def transfer(conn, source_id, target_id, amount, desc=None):
+LOCK_TRANSFER_ACCOUNTS = """
+    SELECT AccountID, Balance, Status
+    FROM account
+    WHERE AccountID IN (%s, %s)
+    FOR UPDATE
+"""
+
+def transfer_tx(conn, source_id, target_id, amount, desc=None): #raises on failure
     amount = money(amount)
     try:
         with conn.cursor() as cur:
             conn.begin()
 
             a1, a2 = sorted([source_id, target_id])
-            cur.execute("""
-                SELECT AccountID, Balance
-                FROM account
-                WHERE AccountID IN (%s, %s)
-                FOR UPDATE
-            """, (a1, a2))
+            cur.execute(LOCK_TRANSFER_ACCOUNTS, (a1, a2))
             rows = cur.fetchall()
             if len(rows) < 2:
                 raise Exception("One or both accounts do not exist.")
+            if any(r['Status'] == CLOSED for r in rows):
+                raise Exception("Account is closed.")
 
             bal = {r['AccountID']: money(r['Balance']) for r in rows}
 
@@ -198,8 +283,8 @@ def transfer(conn, source_id, target_id, amount, desc=None):
             bal[source_id] -= amount
             bal[target_id] += amount
 
-            cur.execute("UPDATE account SET Balance=%s WHERE AccountID=%s",(bal[source_id], source_id))
-            cur.execute("UPDATE account SET Balance=%s WHERE AccountID=%s",(bal[target_id], target_id))
+            cur.execute(SET_BALANCE, (bal[source_id], source_id))
+            cur.execute(SET_BALANCE, (bal[target_id], target_id))
 
             cur.execute("""
                 INSERT INTO transaction
@@ -208,96 +293,352 @@ def transfer(conn, source_id, target_id, amount, desc=None):
             """, (source_id, target_id, amount, desc))
 
             conn.commit()
-            print("Transfer successful!")
-    except Exception as e:
+            cache.invalidate_account(source_id, "accounts")
+            cache.invalidate_account(target_id, "accounts")
+    except Exception:
         conn.rollback()
+        raise
+
+def transfer(conn, source_id, target_id, amount, desc=None):
+    try:
+        transfer_tx(conn, source_id, target_id, amount, desc)
+        print("Transfer successful!")
+        return True
+    except Exception as e:
         print("Transfer failed:", e)
+        return False
+
+# ------------------------------------------------------------
+# BATCH LOCKS
+# ------------------------------------------------------------
+#row locks for a batch of accounts (bulk.py, hot.py, autotransfer.py), taken in ascending AccountID order
+#like transfer_tx sorts a1, a2; closed accounts are left out
+LOCK_ACCOUNTS = """
+    SELECT AccountID, Balance
+    FROM account
+    WHERE AccountID IN ({marks}) AND Status<>%s
+    ORDER BY AccountID
+    FOR UPDATE
+"""
+
+def lock_accounts(cur, account_ids): #returns {AccountID: balance}
+    cur.execute(LOCK_ACCOUNTS.format(marks=",".join(["%s"]*len(account_ids))), (*account_ids, CLOSED))
+    return {r['AccountID']: money(r['Balance']) for r in cur.fetchall()}
+
+# ------------------------------------------------------------
+# FAST PATH (conditional single-statement updates)
+# ------------------------------------------------------------
+#check and update happen in one UPDATE, so the row lock is held for one round-trip instead of three
+#with multi=True (connection opened with MULTI_DB_CONFIG) the ledger insert rides along in the same round-trip
+ACCOUNT_STATUS = "SELECT Status FROM account WHERE AccountID=%s"
+WITHDRAW_IF_FUNDED = """
+    UPDATE account SET Balance = Balance - %s
+    WHERE AccountID=%s AND Balance >= %s AND Status<>%s
+"""
+DEPOSIT_IF_OPEN = "UPDATE account SET Balance = Balance + %s WHERE AccountID=%s AND Status<>%s"
+
+def failure_reason(conn, source_id): #only looked up after a failed fast-path update
+    with conn.cursor() as cur:
+        cur.execute(ACCOUNT_STATUS, (source_id,))
+        row = cur.fetchone()
+    conn.rollback()
+    if not row:
+        return "Account not found."
+    if row['Status'] == CLOSED:
+        return "Account is closed."
+    return "Insufficient funds."
+
+def withdraw_fast_tx(conn, source_id, amount, desc=None, multi=False): #raises on failure
+    amount = money(amount)
+    if amount <= 0:
+        raise Exception("Amount must be positive.")
+    try:
+        with conn.cursor() as cur:
+            if multi:
+                cur.execute(WITHDRAW_IF_FUNDED + """;
+                    INSERT INTO transaction
+                    (SourceAccountID, Type, Amount, Description)
+                    SELECT %s, 'Withdraw', %s, %s FROM DUAL WHERE ROW_COUNT() = 1
+                """, (amount, source_id, amount, CLOSED, source_id, amount, desc))
+                updated = cur.rowcount
+                while cur.nextset(): #drain the INSERT result
+                    pass
+            else:
+                cur.execute(WITHDRAW_IF_FUNDED, (amount, source_id, amount, CLOSED))
+                updated = cur.rowcount
+                if updated == 1:
+                    cur.execute("""
+                        INSERT INTO transaction
+                        (SourceAccountID, Type, Amount, Description)
+                        VALUES (%s, 'Withdraw', %s, %s)
+                    """, (source_id, amount, desc))
+        if updated != 1:
+            conn.rollback()
+            raise Exception(failure_reason(conn, source_id))
+        conn.commit()
+        cache.invalidate_account(source_id, "accounts")
+    except Exception:
+        conn.rollback()
+        raise
+
+def deposit_fast_tx(conn, source_id, amount, desc=None, multi=False): #raises on failure
+    amount = money(amount)
+    if amount <= 0:
+        raise Exception("Amount must be positive.")
+    try:
+        with conn.cursor() as cur:
+            if multi:
+                cur.execute(DEPOSIT_IF_OPEN + """;
+                    INSERT INTO transaction
+                    (SourceAccountID, Type, Amount, Description)
+                    SELECT %s, 'Deposit', %s, %s FROM DUAL WHERE ROW_COUNT() = 1
+                """, (amount, source_id, CLOSED, source_id, amount, desc))
+                updated = cur.rowcount
+                while cur.nextset():
+                    pass
+            else:
+                cur.execute(DEPOSIT_IF_OPEN, (amount, source_id, CLOSED))
+                updated = cur.rowcount
+                if updated == 1:
+                    cur.execute("""
+                        INSERT INTO transaction
+                        (SourceAccountID, Type, Amount, Description)
+                        VALUES (%s, 'Deposit', %s, %s)
+                    """, (source_id, amount, desc))
+        if updated != 1:
+            conn.rollback()
+            raise Exception(failure_reason(conn, source_id))
+        conn.commit()
+        cache.invalidate_account(source_id, "accounts")
+    except Exception:
+        conn.rollback()
+        raise
 
 # ------------------------------------------------------------
 # AUTOTRANSFER
 # ------------------------------------------------------------
-def create_autotransfer(conn, source, target, amount, frequency, date):
+SHARE_AUTOTRANSFER_ACCOUNTS = """
+    SELECT AccountID, UserID, Status
+    FROM account
+    WHERE AccountID IN (%s, %s)
+    FOR SHARE
+"""
+
+def create_autotransfer_tx(conn, source, target, amount, frequency, date): #raises on failure
     amount = money(amount)
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO autotransfer
-            (SourceAccountID, TargetAccountID, Amount, Frequency, TransferDate)
-            VALUES (%s,%s,%s,%s,%s)
-        """, (source, target, amount, frequency, date))
-    conn.commit()
-    print("AutoTransfer successfully created.")
+    try:
+        with conn.cursor() as cur:
+            conn.begin()
+
+            #shared locks: delete_account_tx cannot close either account before the insert commits
+            cur.execute(SHARE_AUTOTRANSFER_ACCOUNTS, (source, target))
+            rows = {r['AccountID']: r for r in cur.fetchall()}
+            if source not in rows or target not in rows:
+                raise Exception("One or both accounts do not exist.")
+            if any(r['Status'] == CLOSED for r in rows.values()):
+                raise Exception("Account is closed.")
+
+            cur.execute("""
+                INSERT INTO autotransfer
+                (SourceAccountID, TargetAccountID, Amount, Frequency, TransferDate, DayOfMonth)
+                VALUES (%s,%s,%s,%s,%s,DAYOFMONTH(%s))
+            """, (source, target, amount, frequency, date, date))
+            autotransfer_id = cur.lastrowid
+
+            conn.commit()
+            cache.invalidate(("autotransfers", rows[source]['UserID'])) #whose autotransfer list changed
+            return autotransfer_id
+    except Exception:
+        conn.rollback()
+        raise
 
+def create_autotransfer(conn, source, target, amount, frequency, date):
+    try:
+        autotransfer_id = create_autotransfer_tx(conn, source, target, amount, frequency, date)
+        print("AutoTransfer successfully created.")
+        return autotransfer_id
+    except Exception as e:
+        print("AutoTransfer failed:", e)
+        return None
 
 # ------------------------------------------------------------
 # LIST
 # ------------------------------------------------------------
 
+USER_ACCOUNTS = """
+    SELECT * FROM account
+    WHERE UserID = %s AND Status<>%s
+    ORDER BY AccountID
+"""
+
+def fetch_user_accounts(conn, user_id):
+    def load():
+        with conn.cursor() as cur:
+            cur.execute(USER_ACCOUNTS, (user_id, CLOSED))
+            return cur.fetchall()
+    return cache.get_or_load(("accounts", user_id), load, ("AccountID",))
+
 def list_user_accounts(conn, user_id):
+    rows = fetch_user_accounts(conn, user_id)
+    print_table(rows, ["AccountID", "AccountType", "Balance", "Status", "CreatedTime"])
+
+PAGE_ACCOUNTS = """
+    SELECT a.*, u.FName, u.LName
+    FROM account a
+    JOIN user u ON a.UserID = u.UserID
+    WHERE a.AccountID > %s
+    ORDER BY a.AccountID
+    LIMIT %s
+"""
+
+def page_all_accounts(conn, after_id=None, limit=PAGE_SIZE): #keyset page, AccountID ascending
     with conn.cursor() as cur:
-        cur.execute("""
-            SELECT * FROM account
-            WHERE UserID = %s
-            ORDER BY AccountID
-        """, (user_id,))
-        rows = cur.fetchall()
-        print_table(rows, ["AccountID", "AccountType", "Balance", "Status", "CreatedTime"])
+        cur.execute(PAGE_ACCOUNTS, (after_id if after_id is not None else -1, limit))
+        return cur.fetchall()
 
 def list_all_accounts(conn):
+    pages = iter_pages(lambda last, limit: page_all_accounts(conn, last, limit), "AccountID")
+    print_pages(pages, ["AccountID", "FName", "LName", "AccountType", "Balance", "Status", "CreatedTime"])
+
+#outgoing and incoming legs each drive off account(UserID) into a transaction index;
+#UNION drops the duplicate when both sides belong to the user
+USER_TRANSACTIONS = """
+    SELECT t.*
+    FROM account a
+    JOIN transaction t ON t.SourceAccountID = a.AccountID
+    WHERE a.UserID = %s
+    UNION
+    SELECT t.*
+    FROM account a
+    JOIN transaction t ON t.RecipientAccountID = a.AccountID
+    WHERE a.UserID = %s
+    ORDER BY TransactionID DESC
+"""
+
+def fetch_user_transactions(conn, user_id):
     with conn.cursor() as cur:
-        cur.execute("""
-            SELECT a.*, u.FName, u.LName
-            FROM account a
-            JOIN user u ON a.UserID = u.UserID
-            ORDER BY AccountID
-        """)
-        rows = cur.fetchall()
-        print_table(rows, ["AccountID", "FName", "LName", "AccountType", "Balance", "Status", "CreatedTime"])
+        cur.execute(USER_TRANSACTIONS, (user_id, user_id))
+        return cur.fetchall()
 
 def list_user_transactions(conn, user_id):
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT *
-            FROM transaction
-            WHERE SourceAccountID IN (
-                SELECT AccountID FROM account WHERE UserID=%s
-            )
-            ORDER BY TransactionID DESC
-        """, (user_id,))
-
-        rows = cur.fetchall()
-        print_table(rows, ["TransactionID", "SourceAccountID", "RecipientAccountID","Type", "Amount", "Description", "CreatedTime"])
+    rows = fetch_user_transactions(conn, user_id)
+    print_table(rows, ["TransactionID", "SourceAccountID", "RecipientAccountID","Type", "Amount", "Description", "CreatedTime"])
        
-def list_all_transactions(conn):
+LATEST_TRANSACTIONS = """
+    SELECT *
+    FROM transaction
+    ORDER BY TransactionID DESC
+    LIMIT %s
+"""
+TRANSACTIONS_BEFORE = """
+    SELECT *
+    FROM transaction
+    WHERE TransactionID < %s
+    ORDER BY TransactionID DESC
+    LIMIT %s
+"""
+
+def page_all_transactions(conn, before_id=None, limit=PAGE_SIZE): #keyset page, TransactionID descending
     with conn.cursor() as cur:
-        cur.execute("""
-            SELECT *
-            FROM transaction
-            ORDER BY TransactionID DESC
-        """)
-        rows = cur.fetchall()
-        print_table(rows, ["TransactionID", "SourceAccountID", "RecipientAccountID","Type", "Amount", "Description", "CreatedTime"])
+        if before_id is None:
+            cur.execute(LATEST_TRANSACTIONS, (limit,))
+        else:
+            cur.execute(TRANSACTIONS_BEFORE, (before_id, limit))
+        return cur.fetchall()
+
+def list_all_transactions(conn):
+    pages = iter_pages(lambda last, limit: page_all_transactions(conn, last, limit), "TransactionID")
+    print_pages(pages, ["TransactionID", "SourceAccountID", "RecipientAccountID","Type", "Amount", "Description", "CreatedTime"])
+
+USER_AUTOTRANSFERS = """
+    SELECT at.*
+    FROM autotransfer at
+    JOIN account a ON at.SourceAccountID = a.AccountID
+    WHERE a.UserID = %s
+    ORDER BY AutoTransferID
+"""
+
+def fetch_user_autotransfers(conn, user_id):
+    def load():
+        with conn.cursor() as cur:
+            cur.execute(USER_AUTOTRANSFERS, (user_id,))
+            return cur.fetchall()
+    return cache.get_or_load(("autotransfers", user_id), load, ("SourceAccountID", "TargetAccountID"))
 
 def list_user_autotransfers(conn, user_id):
+    rows = fetch_user_autotransfers(conn, user_id)
+    print_table(rows, ["AutoTransferID", "SourceAccountID", "TargetAccountID","Amount", "Frequency", "TransferDate", "created_at"])
+
+PAGE_AUTOTRANSFERS = """
+    SELECT *
+    FROM autotransfer
+    WHERE AutoTransferID > %s
+    ORDER BY AutoTransferID
+    LIMIT %s
+"""
+
+def page_all_autotransfers(conn, after_id=None, limit=PAGE_SIZE): #keyset page, AutoTransferID ascending
     with conn.cursor() as cur:
-        cur.execute("""
-            SELECT at.*
-            FROM autotransfer at
-            JOIN account a ON at.SourceAccountID = a.AccountID
-            WHERE a.UserID = %s
-            ORDER BY AutoTransferID
-        """, (user_id,))
-        rows = cur.fetchall()
-        print_table(rows, ["AutoTransferID", "SourceAccountID", "TargetAccountID","Amount", "Frequency", "TransferDate", "created_at"])
+        cur.execute(PAGE_AUTOTRANSFERS, (after_id if after_id is not None else -1, limit))
+        return cur.fetchall()
 
 def list_all_autotransfers(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT * 
-            FROM autotransfer 
-            ORDER BY AutoTransferID
-        """)
-        rows = cur.fetchall()
-        print_table(rows, ["AutoTransferID", "SourceAccountID", "TargetAccountID", "Amount", "Frequency", "TransferDate", "created_at"])
+    pages = iter_pages(lambda last, limit: page_all_autotransfers(conn, last, limit), "AutoTransferID")
+    print_pages(pages, ["AutoTransferID", "SourceAccountID", "TargetAccountID", "Amount", "Frequency", "TransferDate", "created_at"])
+
+# ------------------------------------------------------------
+# STREAMING
+# ------------------------------------------------------------
+def iter_pages(fetch_page, key, limit=PAGE_SIZE): #follows keyset pages; only one page is held at a time
+    last = None
+    while True:
+        rows = fetch_page(last, limit)
+        if rows:
+            yield rows
+        if len(rows) < limit:
+            return
+        last = rows[-1][key]
+
+def streaming_cursor(conn, tuples=False): #unbuffered cursor class; the timed one on an instrumented connection
+    default = getattr(conn, "cursorclass", None)
+    if tuples:
+        return getattr(default, "streaming_tuple_cursor", pymysql.cursors.SSCursor)
+    return getattr(default, "streaming_cursor", pymysql.cursors.SSDictCursor)
+
+def stream_rows(conn, query, args=None): #unbuffered server-side cursor, rows are read from the socket as they are consumed
+    #conn cannot run another query until the generator is exhausted or closed
+    with conn.cursor(streaming_cursor(conn)) as cur:
+        cur.execute(query, args)
+        for row in cur:
+            yield row
+
+def iter_chunks(rows, size=PAGE_SIZE): #groups a row stream into pages for print_pages
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+ALL_TRANSACTIONS = "SELECT * FROM transaction ORDER BY TransactionID DESC"
+ALL_ACCOUNTS = """
+    SELECT a.*, u.FName, u.LName
+    FROM account a
+    JOIN user u ON a.UserID = u.UserID
+    ORDER BY a.AccountID
+"""
+ALL_AUTOTRANSFERS = "SELECT * FROM autotransfer ORDER BY AutoTransferID"
+
+def stream_all_transactions(conn):
+    return stream_rows(conn, ALL_TRANSACTIONS)
+
+def stream_all_accounts(conn):
+    return stream_rows(conn, ALL_ACCOUNTS)
+
+def stream_all_autotransfers(conn):
+    return stream_rows(conn, ALL_AUTOTRANSFERS)
 
 
 # ------------------------------------------------------------
@@ -308,38 +649,43 @@ def search_user(conn):
     print("\n=== USER SEARCH ===")
     key = input("Enter first name, last name, or email: ").strip()
 
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT *
-            FROM user
-            WHERE FName LIKE %s
-               OR LName LIKE %s
-               OR Email LIKE %s
-        """, (f"%{key}%", f"%{key}%", f"%{key}%"))
-        
-        users = cur.fetchall()
+    after_id = 0
+    while True:
+        users = search_users(conn, key, after_id=after_id)
 
         if not users:
-            print(" No users found.")
+            print(" No users found." if after_id == 0 else " No more users.")
             return None
 
-        print(f"\nFound {len(users)} user(s):\n")
+        print(f"\nShowing {len(users)} user(s):\n")
         print_table(users, [
             "UserID", "FName", "LName",
             "Email", "PhoneNumber", "CreatedTime"
         ])
+        more = len(users) >= SEARCH_LIMIT
+        choice = input("\nEnter UserID to manage (0 = cancel" + (", n = next page" if more else "") + "): ").strip()
+        if more and choice.lower() == 'n':
+            after_id = users[-1]['UserID']
+            continue
         try:
-            user_id = int(input("\nEnter UserID to manage (0 = cancel): "))
+            user_id = int(choice)
             if user_id == 0:
                 return None
             return user_id
         except:
             return None
 
+USER_NAME = "SELECT FName, LName FROM user WHERE UserID=%s"
+
+def fetch_user_name(conn, user_id):
+    def load():
+        with conn.cursor() as cur:
+            cur.execute(USER_NAME, (user_id,))
+            return cur.fetchone()
+    return cache.get_or_load(("user", user_id), load)
+
 def admin_manage_user(conn, user_id):
-    with conn.cursor() as cur:
-        cur.execute("SELECT FName, LName FROM user WHERE UserID=%s", (user_id,))
-        user = cur.fetchone()
+    user = fetch_user_name(conn, user_id)
 
     while True:
         print(f"""
@@ -454,6 +800,18 @@ def print_table(rows, headers=None):
     # Rows
     for r in str_rows:
         print("  ".join(r[i].ljust(col_widths[i]) for i in range(len(headers))))
+
+def print_pages(pages, headers=None, interactive=True):
+    # Pages are printed as they arrive, column widths are per page
+    shown = 0
+    for rows in pages:
+        if shown and interactive:
+            if input("\n-- Enter: next page, q: stop -- ").strip().lower() == 'q':
+                break
+        print_table(rows, headers)
+        shown += 1
+    if not shown:
+        print("(no data)")
  
 # ------------------------------------------------------------
 # MAIN
@@ -0,0 +1,257 @@
+import sys
+import time
+import random
+import threading
+
+from bank import MULTI_DB_CONFIG, connect, deposit_tx, withdraw_tx, deposit_fast_tx, withdraw_fast_tx
+from pool import ConnectionPool
+from service import BankService
+from instrument import stats, instrumented
+from ledger import LocalLedger
+
+# ------------------------------------------------------------
+# HELPERS
+# ------------------------------------------------------------
+def make_fixtures(service, n_accounts, balance=1000000): #one bench user owning n_accounts accounts
+    tag = f"{int(time.time()*1000)}-{random.randint(0, 9999)}"
+    user_id = service.create_user("Bench", None, "User", "2000-01-01", f"bench-{tag}@example.com", "bench", "010-0000-0000")
+    return [service.create_account(user_id, balance, None, "Checking Account") for _ in range(n_accounts)]
+
+def make_users(service, n_users, per_user=2, balance=1000000): #[(user_id, [account ids])]
+    tag = f"{int(time.time()*1000)}-{random.randint(0, 9999)}"
+    users = []
+    for i in range(n_users):
+        user_id = service.create_user("Load", None, f"User{i}", "2000-01-01", f"load-{tag}-{i}@example.com", "load", "010-0000-0000")
+        users.append((user_id, [service.create_account(user_id, balance, None, "Checking Account") for _ in range(per_user)]))
+    return users
+
+def run_clients(n_clients, seconds, op): #calls op(rng) from n_clients threads; returns (ok, failed, latencies ms)
+    stop = time.monotonic() + seconds
+    lock = threading.Lock()
+    totals = {"ok": 0, "failed": 0}
+    latencies = []
+
+    def client(seed):
+        rng = random.Random(seed)
+        ok = failed = 0
+        mine = []
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            try:
+                op(rng)
+                ok += 1
+            except Exception:
+                failed += 1
+            mine.append((time.perf_counter()-start)*1000)
+        with lock:
+            totals["ok"] += ok
+            totals["failed"] += failed
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return totals["ok"], totals["failed"], latencies
+
+def run_mix(n_clients, seconds, mix): #mix: [(label, weight, op(rng))]; returns {label: (ok, failed, latencies ms)}
+    stop = time.monotonic() + seconds
+    lock = threading.Lock()
+    results = {label: [0, 0, []] for label, _, _ in mix}
+    labels = [label for label, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    ops = {label: op for label, _, op in mix}
+
+    def client(seed):
+        rng = random.Random(seed)
+        mine = {label: [0, 0, []] for label in labels}
+        while time.monotonic() < stop:
+            label = rng.choices(labels, weights)[0]
+            start = time.perf_counter()
+            try:
+                ops[label](rng)
+                mine[label][0] += 1
+            except Exception:
+                mine[label][1] += 1
+            mine[label][2].append((time.perf_counter()-start)*1000)
+        with lock:
+            for label, (ok, failed, latencies) in mine.items():
+                results[label][0] += ok
+                results[label][1] += failed
+                results[label][2].extend(latencies)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {label: tuple(r) for label, r in results.items()}
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples)-1, int(len(samples)*p/100))]
+
+def report(label, ok, failed, latencies, seconds):
+    print(f"{label:<20} {ok/seconds:10.1f} ops/s   ok {ok:<8} failed {failed:<6} p50 {percentile(latencies, 50):7.2f} ms   p99 {percentile(latencies, 99):7.2f} ms")
+
+# ------------------------------------------------------------
+# BENCHMARKS
+# ------------------------------------------------------------
+def throughput(clients, seconds, n_accounts): #mixed deposit/withdraw/transfer through the service layer
+    service = BankService(ConnectionPool(size=max(clients)))
+    accounts = make_fixtures(service, n_accounts)
+
+    def op(rng):
+        kind = rng.random()
+        if kind < 0.4:
+            service.deposit(rng.choice(accounts), "1.00", "bench")
+        elif kind < 0.7:
+            service.withdraw(rng.choice(accounts), "1.00", "bench")
+        else:
+            source, target = rng.sample(accounts, 2)
+            service.transfer(source, target, "1.00", "bench")
+
+    print(f"{n_accounts} accounts, {seconds}s per step")
+    for n in clients:
+        ok, failed, latencies = run_clients(n, seconds, op)
+        report(f"{n} clients", ok, failed, latencies, seconds)
+    service.close()
+
+def contention(clients, seconds, n_hot): #deposit/withdraw hammering a few hot accounts, locking path vs fast paths
+    pool = ConnectionPool(size=clients+1, config=MULTI_DB_CONFIG)
+    service = BankService(pool)
+    hot = make_fixtures(service, n_hot)
+
+    paths = [
+        ("FOR UPDATE", lambda conn, a, rng: (deposit_tx if rng.random() < 0.5 else withdraw_tx)(conn, a, "0.01", "bench")),
+        ("conditional", lambda conn, a, rng: (deposit_fast_tx if rng.random() < 0.5 else withdraw_fast_tx)(conn, a, "0.01", "bench")),
+        ("conditional+multi", lambda conn, a, rng: (deposit_fast_tx if rng.random() < 0.5 else withdraw_fast_tx)(conn, a, "0.01", "bench", multi=True)),
+    ]
+    print(f"{clients} clients on {n_hot} hot account(s), {seconds}s per path")
+    for label, call in paths:
+        def op(rng):
+            with pool.connection() as conn:
+                call(conn, rng.choice(hot), rng)
+        ok, failed, latencies = run_clients(clients, seconds, op)
+        report(label, ok, failed, latencies, seconds)
+    service.close()
+
+def load(clients, seconds, n_users, slow_ms): #mixed app traffic with per-statement instrumentation
+    stats.slow_ms = slow_ms
+    stats.slow_log = "slow_queries.log"
+    service = BankService(ConnectionPool(size=clients, config=instrumented()))
+    users = make_users(service, n_users)
+    accounts = [a for _, owned in users for a in owned]
+
+    def create_user(rng):
+        email = f"load-{time.time_ns()}-{rng.randint(0, 10**9)}@example.com"
+        service.create_user("Load", None, "New", "2000-01-01", email, "load", "010-0000-0000")
+
+    def transfer(rng):
+        source, target = rng.sample(accounts, 2)
+        service.transfer(source, target, "1.00", "load")
+
+    mix = [
+        ("create_user", 5, create_user),
+        ("deposit", 25, lambda rng: service.deposit(rng.choice(accounts), "1.00", "load")),
+        ("withdraw", 20, lambda rng: service.withdraw(rng.choice(accounts), "1.00", "load")),
+        ("transfer", 25, transfer),
+        ("list accounts", 10, lambda rng: service.user_accounts(rng.choice(users)[0])),
+        ("list transactions", 10, lambda rng: service.user_transactions(rng.choice(users)[0])),
+        ("list autotransfers", 5, lambda rng: service.user_autotransfers(rng.choice(users)[0])),
+    ]
+    stats.reset() #fixtures are not part of the run
+    print(f"{clients} clients, {n_users} users, {seconds}s")
+    results = run_mix(clients, seconds, mix)
+    for label, (ok, failed, latencies) in results.items():
+        report(label, ok, failed, latencies, seconds)
+    report("total", sum(r[0] for r in results.values()), sum(r[1] for r in results.values()),
+           [ms for r in results.values() for ms in r[2]], seconds)
+    print()
+    stats.report()
+    service.close()
+
+def ledger(path, queries, limit): #one account's newest history page: local bptree index vs MySQL
+    local = LocalLedger(path)
+    conn = connect()
+    try:
+        start = time.perf_counter()
+        added = local.sync(conn)
+        print(f"synced {added} new transaction(s) in {time.perf_counter()-start:.2f}s, {local.tree.count} index entries")
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT AccountID FROM account ORDER BY AccountID LIMIT 10000")
+            accounts = [r['AccountID'] for r in cur.fetchall()]
+        conn.rollback()
+        if not accounts:
+            print("no accounts to query")
+            return
+        picks = [random.choice(accounts) for _ in range(queries)]
+
+        def mysql_history(account_id):
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT * FROM transaction WHERE SourceAccountID = %s
+                    UNION
+                    SELECT * FROM transaction WHERE RecipientAccountID = %s
+                    ORDER BY TransactionID DESC
+                    LIMIT %s
+                """, (account_id, account_id, limit))
+                rows = cur.fetchall()
+            conn.rollback()
+            return rows
+
+        print(f"{queries} history pages of {limit} rows")
+        for label, history in [("local bptree", lambda a: local.history(a, limit=limit)), ("mysql", mysql_history)]:
+            latencies = []
+            start = time.perf_counter()
+            for account_id in picks:
+                t = time.perf_counter()
+                history(account_id)
+                latencies.append((time.perf_counter()-t)*1000)
+            report(label, queries, 0, latencies, time.perf_counter()-start)
+    finally:
+        conn.close()
+        local.close()
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def main():
+    args = sys.argv
+
+    if len(args) > 1 and args[1] == "throughput": #throughput [max_clients] [seconds] [accounts]
+        max_clients = int(args[2]) if len(args) > 2 else 32
+        seconds = float(args[3]) if len(args) > 3 else 5
+        n_accounts = int(args[4]) if len(args) > 4 else 100
+        clients = [1]
+        while clients[-1]*2 <= max_clients:
+            clients.append(clients[-1]*2)
+        throughput(clients, seconds, n_accounts)
+    elif len(args) > 1 and args[1] == "contention": #contention [clients] [seconds] [hot_accounts]
+        clients = int(args[2]) if len(args) > 2 else 16
+        seconds = float(args[3]) if len(args) > 3 else 5
+        n_hot = int(args[4]) if len(args) > 4 else 1
+        contention(clients, seconds, n_hot)
+    elif len(args) > 1 and args[1] == "load": #load [clients] [seconds] [users] [slow_ms]
+        clients = int(args[2]) if len(args) > 2 else 16
+        seconds = float(args[3]) if len(args) > 3 else 10
+        n_users = int(args[4]) if len(args) > 4 else 50
+        slow_ms = float(args[5]) if len(args) > 5 else 100
+        load(clients, seconds, n_users, slow_ms)
+    elif len(args) > 1 and args[1] == "ledger": #ledger [path] [queries] [limit]
+        path = args[2] if len(args) > 2 else "ledger"
+        queries = int(args[3]) if len(args) > 3 else 1000
+        limit = int(args[4]) if len(args) > 4 else 100
+        ledger(path, queries, limit)
+    else:
+        print("usage: python bench.py throughput [max_clients] [seconds] [accounts]")
+        print("       python bench.py contention [clients] [seconds] [hot_accounts]")
+        print("       python bench.py load [clients] [seconds] [users] [slow_ms]")
+        print("       python bench.py ledger [path] [queries] [limit]")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import sys
+import csv
+import time
+from decimal import InvalidOperation
+
+from bank import money, connect, cache, lock_accounts, SET_BALANCE
+
+# ------------------------------------------------------------
+# BULK INGESTION
+# ------------------------------------------------------------
+TYPES = {"deposit": "Deposit", "withdraw": "Withdraw", "transfer": "Transfer"}
+
+def parse_op(op):
+    #op: {"type": deposit|withdraw|transfer, "account": id, "target": id (transfer only), "amount": x, "desc": str}
+    kind = TYPES.get(str(op.get("type", "")).strip().lower())
+    if kind is None:
+        raise Exception(f"Unknown operation type: {op.get('type')}")
+    try:
+        amount = money(op["amount"])
+    except (KeyError, InvalidOperation, TypeError, ValueError):
+        raise Exception("Invalid amount.")
+    if amount <= 0:
+        raise Exception("Amount must be positive.")
+    source = int(op["account"])
+    target = int(op["target"]) if kind == "Transfer" else None
+    if kind == "Transfer" and source == target:
+        raise Exception("Source and target are the same account.")
+    return kind, source, target, amount, op.get("desc")
+
+def apply_chunk(conn, ops, results, offset):
+    #one DB transaction for the chunk; per-item failures go to results, a DB error fails the whole chunk
+    parsed = {}
+    for i, op in enumerate(ops):
+        try:
+            parsed[i] = parse_op(op)
+        except Exception as e:
+            results[offset+i] = {"index": offset+i, "ok": False, "error": str(e)}
+    if not parsed:
+        return
+
+    accounts = sorted({p[1] for p in parsed.values()} | {p[2] for p in parsed.values() if p[2] is not None})
+    try:
+        with conn.cursor() as cur:
+            conn.begin()
+
+            bal = lock_accounts(cur, accounts)
+
+            touched = set()
+            transactions = []
+            done = {}
+            for i, (kind, source, target, amount, desc) in parsed.items(): #in file order, so funds are checked as they would be one by one
+                if source not in bal or (target is not None and target not in bal):
+                    done[i] = {"index": offset+i, "ok": False, "error": "Account not found."}
+                    continue
+                if kind != "Deposit" and bal[source] < amount:
+                    done[i] = {"index": offset+i, "ok": False, "error": "Insufficient funds."}
+                    continue
+                if kind == "Deposit":
+                    bal[source] += amount
+                else:
+                    bal[source] -= amount
+                if target is not None:
+                    bal[target] += amount
+                    touched.add(target)
+                touched.add(source)
+                transactions.append((source, target, kind, amount, desc))
+                done[i] = {"index": offset+i, "ok": True, "error": None}
+
+            if transactions:
+                cur.executemany(SET_BALANCE, [(bal[a], a) for a in sorted(touched)]) #net result, one update per account
+                cur.executemany("""
+                    INSERT INTO transaction
+                    (SourceAccountID, RecipientAccountID, Type, Amount, Description)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, transactions)
+
+            conn.commit()
+            for account_id in touched:
+                cache.invalidate_account(account_id, "accounts")
+    except Exception as e:
+        conn.rollback()
+        done = {i: {"index": offset+i, "ok": False, "error": f"Chunk rolled back: {e}"} for i in parsed}
+    for i, result in done.items():
+        results[offset+i] = result
+
+def apply_batch(conn, ops, chunk_size=1000):
+    #commits every chunk_size operations; returns one result dict per op, in order
+    results = [None]*len(ops)
+    for start in range(0, len(ops), chunk_size):
+        apply_chunk(conn, ops[start:start+chunk_size], results, start)
+    return results
+
+def read_ops(filename): #csv: type,account,target,amount,description
+    ops = []
+    with open(filename, "r", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            row += [""]*(5-len(row))
+            ops.append({"type": row[0], "account": row[1], "target": row[2] or None,
+                        "amount": row[3], "desc": row[4] or None})
+    return ops
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def main(): #python bulk.py ops.csv [chunk_size]
+    args = sys.argv
+    if len(args) < 2:
+        print("usage: python bulk.py ops.csv [chunk_size]")
+        return
+    chunk_size = int(args[2]) if len(args) > 2 else 1000
+
+    ops = read_ops(args[1])
+    conn = connect()
+    try:
+        start = time.perf_counter()
+        results = apply_batch(conn, ops, chunk_size)
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.close()
+
+    failed = [r for r in results if not r["ok"]]
+    for r in failed:
+        print(f"op #{r['index']+1}: {r['error']}")
+    print(f"{len(results)-len(failed)} applied, {len(failed)} failed in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import time
+import threading
+from collections import OrderedDict
+
+# ------------------------------------------------------------
+# RESULT CACHE
+# ------------------------------------------------------------
+class ResultCache:
+    #bounded LRU with a TTL, keyed by (kind, user_id); every entry is linked to the AccountIDs found in
+    #its rows so writes can drop exactly the lists that show that account
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict() #key -> (expires, value, account ids)
+        self.links = {} #account id -> keys
+        self.version = 0 #bumped by every invalidation, so a load racing a write is not cached
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key, load, account_fields=()):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None: #expired
+                self.drop(key)
+            self.misses += 1
+            version = self.version
+
+        value = load()
+        accounts = set()
+        if isinstance(value, (list, tuple)):
+            for row in value:
+                for field in account_fields:
+                    if row.get(field) is not None:
+                        accounts.add(row[field])
+
+        with self.lock:
+            if version == self.version:
+                self.put(key, value, accounts, now + self.ttl)
+        return value
+
+    def put(self, key, value, accounts, expires): #lock held
+        if key in self.entries:
+            self.drop(key)
+        self.entries[key] = (expires, value, accounts)
+        for account_id in accounts:
+            self.links.setdefault(account_id, set()).add(key)
+        while len(self.entries) > self.maxsize:
+            self.drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def drop(self, key): #lock held
+        _, _, accounts = self.entries.pop(key)
+        for account_id in accounts:
+            keys = self.links.get(account_id)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.links[account_id]
+
+    def invalidate(self, key):
+        with self.lock:
+            self.version += 1
+            if key in self.entries:
+                self.drop(key)
+                self.invalidations += 1
+
+    def invalidate_account(self, account_id, kind=None): #kind=None drops every list showing the account
+        with self.lock:
+            self.version += 1
+            for key in list(self.links.get(account_id, ())):
+                if kind is None or key[0] == kind:
+                    self.drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+            self.links.clear()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate(),
+                    "evictions": self.evictions, "invalidations": self.invalidations, "size": len(self.entries)}
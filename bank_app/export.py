@@ -0,0 +1,222 @@
+import os
+import sys
+import csv
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pymysql.constants import FIELD_TYPE
+
+from bank import streaming_cursor
+from pool import ConnectionPool
+
+# ------------------------------------------------------------
+# KEY RANGES
+# ------------------------------------------------------------
+EXPORTS = { #table -> integer primary key the ranges are cut on; user/admin are left out (plaintext Password)
+    "transaction": "TransactionID",
+    "account": "AccountID",
+    "autotransfer": "AutoTransferID",
+}
+FORMATS = {".csv": "csv", ".parquet": "parquet"}
+CHUNK = 50000 #rows fetched and written at a time; one parquet row group
+
+def describe(conn, table): #cursor.description of the table, without reading a row
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT * FROM `{table}` LIMIT 0")
+        description = cur.description
+    conn.rollback()
+    return description
+
+KEY_RANGE = "SELECT MIN({key}) AS lo, MAX({key}) AS hi FROM `{table}`"
+
+def key_ranges(conn, table, key, parts): #inclusive (lo, hi) ranges of roughly equal key width
+    with conn.cursor() as cur:
+        cur.execute(KEY_RANGE.format(table=table, key=key))
+        row = cur.fetchone()
+    conn.rollback()
+    if row['lo'] is None:
+        return []
+    lo, hi = row['lo'], row['hi']
+    step = max(1, -(-(hi - lo + 1) // parts))
+    return [(start, min(hi, start + step - 1)) for start in range(lo, hi + 1, step)]
+
+# ------------------------------------------------------------
+# WRITERS
+# ------------------------------------------------------------
+#csv: Decimal and datetime go through str(), which is exact ("1234.50", "2025-01-01 09:30:00"); NULL is empty
+class CsvWriter:
+    def __init__(self, path, description): #header is written once, by merge_parts
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+def arrow_schema(description):
+    import pyarrow as pa
+
+    fields = []
+    for name, type_code, _, _, precision, scale, _ in description:
+        if type_code in (FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.INT24, FIELD_TYPE.LONG, FIELD_TYPE.LONGLONG):
+            t = pa.int64()
+        elif type_code in (FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL):
+            t = pa.decimal128(min(38, precision), scale) #exact; pymysql reports display length, so this is never too narrow
+        elif type_code in (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP):
+            t = pa.timestamp("us")
+        elif type_code == FIELD_TYPE.DATE:
+            t = pa.date32()
+        elif type_code in (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE):
+            t = pa.float64()
+        else:
+            t = pa.string()
+        fields.append(pa.field(name, t))
+    return pa.schema(fields)
+
+class ParquetWriter:
+    def __init__(self, path, description):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("Parquet export needs pyarrow (pip install pyarrow); use a .csv output instead.")
+        self.pa = pa
+        self.schema = arrow_schema(description)
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows): #one row group per call
+        columns = list(zip(*rows))
+        arrays = [self.pa.array(list(col), type=field.type) for col, field in zip(columns, self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter}
+
+# ------------------------------------------------------------
+# EXPORT
+# ------------------------------------------------------------
+class ExportStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = 0
+        self.parts = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, rows):
+        with self.lock:
+            self.rows += rows
+
+    def part_done(self):
+        with self.lock:
+            self.parts += 1
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return f"{self.rows} rows in {self.parts} parts, {self.elapsed:.2f}s, {self.per_second():.0f} rows/s"
+
+EXPORT_RANGE = "SELECT * FROM `{table}` WHERE {key} BETWEEN %s AND %s ORDER BY {key}"
+
+def export_range(conn, table, key, lo, hi, writer, chunk, stats):
+    #unbuffered tuple cursor: rows come off the socket as they are written, so memory stays at one chunk
+    with conn.cursor(streaming_cursor(conn, tuples=True)) as cur:
+        cur.execute(EXPORT_RANGE.format(table=table, key=key), (lo, hi))
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            writer.write(rows)
+            stats.add(len(rows))
+    conn.rollback()
+
+def merge_parts(paths, output, fmt, description):
+    #parts are concatenated in key order into the single output file, one part/row group at a time
+    if fmt == "csv":
+        with open(output, "w", newline="", encoding="utf-8") as out:
+            csv.writer(out).writerow([d[0] for d in description])
+            for path in paths:
+                with open(path, newline="", encoding="utf-8") as part:
+                    shutil.copyfileobj(part, out)
+        return
+
+    import pyarrow.parquet as pq
+    writer = pq.ParquetWriter(output, arrow_schema(description))
+    try:
+        for path in paths:
+            part = pq.ParquetFile(path)
+            for i in range(part.num_row_groups):
+                writer.write_table(part.read_row_group(i))
+    finally:
+        writer.close()
+
+def export_table(pool, table, output, workers=4, parts=None, chunk=CHUNK):
+    #key ranges run in parallel, each on its own pooled connection and its own part file;
+    #every range is read in one snapshot, but ranges are not a single point-in-time view of the table
+    key = EXPORTS.get(table)
+    if key is None:
+        raise Exception(f"Cannot export table: {table}")
+    fmt = FORMATS.get(os.path.splitext(output)[1].lower())
+    if fmt is None:
+        raise Exception(f"Unknown export format: {output} (use .csv or .parquet)")
+    Writer = WRITERS[fmt]
+
+    with pool.connection() as conn:
+        description = describe(conn, table)
+        ranges = key_ranges(conn, table, key, parts or workers*4)
+
+    stats = ExportStats()
+    tmp = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(os.path.abspath(output)))
+    paths = [os.path.join(tmp, f"part-{i:05d}.{fmt}") for i in range(len(ranges))]
+
+    def work(lo, hi, path):
+        writer = Writer(path, description)
+        try:
+            with pool.connection() as conn:
+                export_range(conn, table, key, lo, hi, writer, chunk, stats)
+        finally:
+            writer.close()
+        stats.part_done()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(work, lo, hi, path) for (lo, hi), path in zip(ranges, paths)]
+            for f in futures:
+                f.result() #re-raises the first failed range
+        merge_parts(paths, output, fmt, description)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    stats.finish()
+    return stats
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def main(): #python export.py <table> <output.csv|output.parquet> [workers]
+    args = sys.argv
+    if len(args) < 3:
+        print("usage: python export.py <table> <output.csv|output.parquet> [workers]")
+        return
+    workers = int(args[3]) if len(args) > 3 else 4
+
+    pool = ConnectionPool(size=workers)
+    try:
+        stats = export_table(pool, args[1], args[2], workers)
+        print(f"Exported {args[1]} to {args[2]}:", stats.summary())
+    finally:
+        pool.close()
+
+if __name__ == "__main__":
+    main()
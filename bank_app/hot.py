@@ -0,0 +1,185 @@
+import time
+import queue
+import random
+import threading
+from concurrent.futures import Future
+
+import pymysql
+
+from bank import money, transfer_tx, cache, lock_accounts, SET_BALANCE
+
+LOCK_ERRORS = (1205, 1213) #lock wait timeout, deadlock
+
+# ------------------------------------------------------------
+# RETRY
+# ------------------------------------------------------------
+def is_lock_error(e):
+    return isinstance(e, pymysql.err.OperationalError) and e.args and e.args[0] in LOCK_ERRORS
+
+def backoff_sleep(attempt, backoff, max_backoff):
+    delay = min(max_backoff, backoff * (2 ** attempt))
+    time.sleep(delay * random.uniform(0.5, 1.0)) #jitter so retried clients do not collide again
+
+def transfer_with_retry(conn, source_id, target_id, amount, desc=None, retries=3, backoff=0.05, max_backoff=1.0):
+    #the existing transfer path, retried with exponential backoff on deadlock / lock wait timeout
+    attempt = 0
+    while True:
+        try:
+            return transfer_tx(conn, source_id, target_id, amount, desc)
+        except Exception as e:
+            if not is_lock_error(e) or attempt >= retries:
+                raise
+            backoff_sleep(attempt, backoff, max_backoff)
+            attempt += 1
+
+# ------------------------------------------------------------
+# HOT ACCOUNT WRITER
+# ------------------------------------------------------------
+class HotAccountWriter:
+    #single writer thread per hot account; pending operations are applied in batches,
+    #coalescing all of them into one balance UPDATE for the hot account and one multi-row transaction insert
+    def __init__(self, pool, account_id, max_batch=500, retries=3, backoff=0.05, max_backoff=1.0):
+        self.pool = pool
+        self.account_id = account_id
+        self.max_batch = max_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name=f"hot-{account_id}", daemon=True)
+        self.thread.start()
+
+    def submit(self, delta_sign, other_id, amount, kind, desc=None):
+        #delta_sign +1: credit hot account (debit other_id if given), -1: debit hot account (credit other_id if given)
+        future = Future()
+        self.queue.put((delta_sign, other_id, money(amount), kind, desc, future))
+        return future
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch: #take whatever queued up while the last batch was being written
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.write_batch(batch)
+
+    def write_batch(self, batch):
+        attempt = 0
+        while True:
+            try:
+                with self.pool.connection() as conn:
+                    results = self.apply(conn, batch)
+                break
+            except Exception as e:
+                if is_lock_error(e) and attempt < self.retries:
+                    backoff_sleep(attempt, self.backoff, self.max_backoff)
+                    attempt += 1
+                    continue
+                for item in batch:
+                    item[-1].set_exception(e)
+                return
+        for item, result in zip(batch, results):
+            if isinstance(result, Exception):
+                item[-1].set_exception(result)
+            else:
+                item[-1].set_result(result)
+
+    def apply(self, conn, batch):
+        #one DB transaction; returns per-item results (new hot balance or an Exception)
+        hot = self.account_id
+        accounts = sorted({hot} | {item[1] for item in batch if item[1] is not None})
+        try:
+            with conn.cursor() as cur:
+                conn.begin()
+
+                bal = lock_accounts(cur, accounts) #same ascending order as transfer(), so no deadlock with it
+
+                results = []
+                transactions = []
+                touched = set()
+                for delta_sign, other, amount, kind, desc, _ in batch:
+                    if hot not in bal or (other is not None and other not in bal):
+                        results.append(Exception("Account not found."))
+                        continue
+                    payer = other if delta_sign > 0 else hot
+                    if payer is not None and bal[payer] < amount:
+                        results.append(Exception("Insufficient funds."))
+                        continue
+                    bal[hot] += amount * delta_sign
+                    if other is not None:
+                        bal[other] -= amount * delta_sign
+                        touched.add(other)
+                    if kind == "Transfer":
+                        source, target = (other, hot) if delta_sign > 0 else (hot, other)
+                        transactions.append((source, target, kind, amount, desc))
+                    else:
+                        transactions.append((hot, None, kind, amount, desc))
+                    results.append(bal[hot])
+
+                if transactions:
+                    updates = [(bal[hot], hot)] + [(bal[a], a) for a in sorted(touched)]
+                    cur.executemany(SET_BALANCE, updates)
+                    cur.executemany("""
+                        INSERT INTO transaction
+                        (SourceAccountID, RecipientAccountID, Type, Amount, Description)
+                        VALUES (%s, %s, %s, %s, %s)
+                    """, transactions)
+
+                conn.commit()
+                if transactions:
+                    for account_id in [hot] + sorted(touched):
+                        cache.invalidate_account(account_id, "accounts")
+                return results
+        except Exception:
+            conn.rollback()
+            raise
+
+# ------------------------------------------------------------
+# ROUTER
+# ------------------------------------------------------------
+class HotAccountRouter:
+    #writes touching a designated hot account go through its writer queue,
+    #everything else takes the normal transfer path with lock-error retry
+    def __init__(self, pool, hot_accounts, max_batch=500, retries=3, backoff=0.05, max_backoff=1.0):
+        self.pool = pool
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.writers = {a: HotAccountWriter(pool, a, max_batch, retries, backoff, max_backoff) for a in hot_accounts}
+
+    def is_hot(self, account_id):
+        return account_id in self.writers
+
+    def deposit(self, account_id, amount, desc=None):
+        return self.writers[account_id].submit(+1, None, amount, "Deposit", desc).result()
+
+    def withdraw(self, account_id, amount, desc=None):
+        return self.writers[account_id].submit(-1, None, amount, "Withdraw", desc).result()
+
+    def transfer(self, source_id, target_id, amount, desc=None):
+        if source_id == target_id:
+            raise Exception("Source and target are the same account.")
+        if target_id in self.writers: #credits are the common case for merchant accounts
+            return self.writers[target_id].submit(+1, source_id, amount, "Transfer", desc).result()
+        if source_id in self.writers:
+            return self.writers[source_id].submit(-1, target_id, amount, "Transfer", desc).result()
+        with self.pool.connection() as conn:
+            return transfer_with_retry(conn, source_id, target_id, amount, desc, self.retries, self.backoff, self.max_backoff)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
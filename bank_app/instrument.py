@@ -0,0 +1,163 @@
+import re
+import time
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+import pymysql
+
+from bank import DB_CONFIG
+from hot import is_lock_error
+
+# ------------------------------------------------------------
+# STATEMENT KEYS
+# ------------------------------------------------------------
+#statements are grouped by their template: literals and placeholders become ?, and lists of them
+#(IN (...) lists, multi-row VALUES) collapse to one, so every call site gets one key
+WHITESPACE = re.compile(r"\s+")
+LITERALS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\b\d+(?:\.\d+)?\b|%s")
+LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+
+@lru_cache(maxsize=1024)
+def statement_key(sql):
+    sql = WHITESPACE.sub(" ", sql).strip()
+    sql = LITERALS.sub("?", sql)
+    sql = LISTS.sub("?", sql)
+    return ROWS.sub("(?)", sql)
+
+# ------------------------------------------------------------
+# QUERY STATS
+# ------------------------------------------------------------
+BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000] #ms upper bounds
+
+class StatementStats:
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0 #ms
+        self.max = 0.0
+        self.rows = 0
+        self.errors = 0
+        self.lock_errors = 0 #lock wait timeout / deadlock
+        self.buckets = [0]*(len(BUCKETS)+1) #last one is > BUCKETS[-1]
+
+    def add(self, ms, rows, error):
+        self.calls += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.rows += rows
+        if error is not None:
+            self.errors += 1
+            if is_lock_error(error):
+                self.lock_errors += 1
+        for i, bound in enumerate(BUCKETS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, p): #upper bound of the bucket holding the p-th percentile
+        target = self.calls * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return 0.0
+
+class QueryStats:
+    #per-statement latency histograms, rows and errors; statements slower than slow_ms are appended to
+    #slow_log (template and timing only: arguments can hold passwords)
+    def __init__(self, slow_ms=100, slow_log=None):
+        self.lock = threading.Lock()
+        self.log_lock = threading.Lock() #keeps slow-log lines whole
+        self.statements = {}
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.slow = 0
+
+    def record(self, sql, seconds, rows=0, error=None):
+        key = statement_key(sql)
+        ms = seconds*1000
+        line = None
+        with self.lock:
+            entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = StatementStats()
+            entry.add(ms, rows, error)
+            if ms >= self.slow_ms:
+                self.slow += 1
+                if self.slow_log:
+                    line = (f"{datetime.now():%Y-%m-%d %H:%M:%S} {ms:9.1f} ms rows={rows} "
+                            f"{'error ' if error is not None else ''}{key}\n")
+        if line: #file I/O outside the stats lock, so a slow disk does not stall every other query
+            with self.log_lock, open(self.slow_log, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def reset(self):
+        with self.lock:
+            self.statements.clear()
+            self.slow = 0
+
+    def snapshot(self): #[(key, StatementStats)], slowest total first
+        with self.lock:
+            return sorted(self.statements.items(), key=lambda kv: kv[1].total, reverse=True)
+
+    def report(self, top=20, width=70):
+        rows = self.snapshot()
+        print(f"{'calls':>8} {'total ms':>10} {'avg':>8} {'p50':>8} {'p99':>8} {'max':>8} {'rows':>8} {'err':>5} {'lock':>5}  statement")
+        for key, s in rows[:top]:
+            print(f"{s.calls:>8} {s.total:>10.1f} {s.total/s.calls:>8.2f} {s.percentile(50):>8.2f} {s.percentile(99):>8.2f} "
+                  f"{s.max:>8.2f} {s.rows:>8} {s.errors:>5} {s.lock_errors:>5}  {key[:width]}")
+        print(f"{len(rows)} statement(s), {self.slow} slower than {self.slow_ms} ms")
+
+stats = QueryStats() #shared by every instrumented connection
+
+# ------------------------------------------------------------
+# CURSORS
+# ------------------------------------------------------------
+class TimedCursorMixin:
+    in_many = False #executemany is recorded once under its template, not per generated statement
+
+    def execute(self, query, args=None):
+        if self.in_many:
+            return super().execute(query, args)
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, args)
+        except Exception as e:
+            stats.record(query, time.perf_counter()-start, 0, e)
+            raise
+        stats.record(query, time.perf_counter()-start, self.counted())
+        return result
+
+    def executemany(self, query, args):
+        start = time.perf_counter()
+        self.in_many = True
+        try:
+            result = super().executemany(query, args)
+        except Exception as e:
+            stats.record(query, time.perf_counter()-start, 0, e)
+            raise
+        finally:
+            self.in_many = False
+        stats.record(query, time.perf_counter()-start, self.counted())
+        return result
+
+    def counted(self): #rows returned or affected; unbuffered cursors do not know yet
+        return self.rowcount if 0 <= self.rowcount < 2**63 else 0
+
+class TimedSSDictCursor(TimedCursorMixin, pymysql.cursors.SSDictCursor): #bank.stream_rows
+    pass
+
+class TimedSSCursor(TimedCursorMixin, pymysql.cursors.SSCursor): #export.export_range
+    pass
+
+class TimedDictCursor(TimedCursorMixin, pymysql.cursors.DictCursor):
+    #found through conn.cursorclass by bank.streaming_cursor, so streams on a timed connection are timed too
+    streaming_cursor = TimedSSDictCursor
+    streaming_tuple_cursor = TimedSSCursor
+
+def instrumented(config=None): #connection config whose default cursor is timed, e.g. ConnectionPool(config=instrumented())
+    return dict(config or DB_CONFIG, cursorclass=TimedDictCursor)
@@ -0,0 +1,230 @@
+import os
+import sys
+import json
+import time
+import heapq
+from decimal import Decimal
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) #bptree.py lives at the repo root
+from bptree import membptree
+
+from bank import connect, PAGE_SIZE
+from rollup import GRACE
+
+# ------------------------------------------------------------
+# LOCAL LEDGER
+# ------------------------------------------------------------
+#offline copy of transaction for history browsing without MySQL:
+#  <path>.log   append-only, one JSON line per transaction (the source of truth)
+#  <path>.dat   bptree with 8-byte keys (AccountID<<32)|TransactionID -> offset of the line in .log,
+#               one key per account a transaction touches, so one account's history is one key range
+#  <path>.mark  watermark sidecar: last TransactionID synced and how much of .log the index covers
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+B = 256 #a leaf holds at most b-1 8-byte key/value pairs: 1 + 4 + 255*16 + 8 = 4093 bytes, one 4096-byte page
+FIELDS = ["TransactionID", "SourceAccountID", "RecipientAccountID", "Type", "Amount", "Description", "CreatedTime"]
+
+FETCH_NEW = """
+    SELECT TransactionID, SourceAccountID, RecipientAccountID, Type, Amount, Description, CreatedTime
+    FROM transaction
+    WHERE TransactionID > %s
+    ORDER BY TransactionID
+    LIMIT %s
+"""
+
+def ledger_key(account_id, transaction_id):
+    if not 0 <= transaction_id <= ID_MASK:
+        raise Exception(f"TransactionID {transaction_id} does not fit the local ledger key.")
+    return (account_id << ID_BITS) | transaction_id
+
+def encode(row): #Amount and CreatedTime as strings, so they come back exactly
+    return (json.dumps({
+        "TransactionID": row['TransactionID'], "SourceAccountID": row['SourceAccountID'],
+        "RecipientAccountID": row['RecipientAccountID'], "Type": row['Type'], "Amount": str(row['Amount']),
+        "Description": row['Description'], "CreatedTime": row['CreatedTime'].isoformat(sep=" "),
+    }) + "\n").encode("utf-8")
+
+def decode(line):
+    row = json.loads(line)
+    row['Amount'] = Decimal(row['Amount'])
+    row['CreatedTime'] = datetime.fromisoformat(row['CreatedTime'])
+    return row
+
+def accounts_of(row):
+    if row['RecipientAccountID'] is None or row['RecipientAccountID'] == row['SourceAccountID']:
+        return [row['SourceAccountID']]
+    return [row['SourceAccountID'], row['RecipientAccountID']]
+
+class LocalLedger:
+    #read_only: for history lookups next to a running sync. Nothing is created, truncated or written back,
+    #so closing cannot put a stale index over the one a sync has just snapshotted
+    def __init__(self, path, snapshot_every=None, read_only=False):
+        self.path = path
+        self.mark_path = path + ".mark"
+        self.log_path = path + ".log"
+        self.read_only = read_only
+        fresh = not os.path.exists(path + ".dat")
+        if fresh and read_only:
+            raise Exception(f"No local ledger at {path}; run ledger.py sync first.")
+        if fresh: #new, or the index was lost: rebuilt from whatever .log holds
+            membptree(path + ".dat", B, create_new=True, key_format="q").close()
+        self.tree = membptree(path + ".dat", snapshot_every=snapshot_every)
+        self.last_id, self.indexed = (0, 0) if fresh else self.read_mark()
+        self.log = open(self.log_path, "rb" if read_only else "a+b")
+        self.recover()
+
+    # watermark
+    def read_mark(self):
+        try:
+            with open(self.mark_path) as f:
+                mark = json.load(f)
+            return mark['LastTransactionID'], mark['Indexed']
+        except FileNotFoundError:
+            return 0, 0
+
+    def write_mark(self): #tmp + rename, like membptree.snapshot
+        tmp = self.mark_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"LastTransactionID": self.last_id, "Indexed": self.indexed}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.mark_path)
+
+    def recover(self):
+        #lines appended after the last watermark (crash between log and index) are indexed again;
+        #inserting an existing key is a no-op, so replaying is safe. A torn last line is cut off.
+        #Read-only, they are only indexed in memory, and a torn line may be a sync still writing it
+        self.log.seek(self.indexed)
+        offset = self.indexed
+        replayed = 0
+        for line in self.log:
+            if not line.endswith(b"\n"):
+                if not self.read_only:
+                    self.log.truncate(offset)
+                break
+            row = decode(line)
+            self.index(row, offset)
+            self.last_id = max(self.last_id, row['TransactionID'])
+            offset += len(line)
+            replayed += 1
+        if replayed and not self.read_only:
+            self.indexed = offset
+            self.tree.flush()
+            self.write_mark()
+
+    def index(self, row, offset):
+        for account_id in accounts_of(row):
+            self.tree.insert(ledger_key(account_id, row['TransactionID']), offset)
+
+    # ingestion
+    def fetch_new(self, conn, limit, cutoff):
+        #next page past the watermark, up to the first row inside the grace window (see rollup.py)
+        with conn.cursor() as cur:
+            cur.execute(FETCH_NEW, (self.last_id, limit))
+            rows = cur.fetchall()
+        conn.rollback()
+        taken = []
+        for r in rows:
+            if r['CreatedTime'] >= cutoff:
+                break
+            taken.append(r)
+        return taken, len(taken) == limit
+
+    def sync(self, conn, batch=5000, grace=GRACE): #returns how many transactions were added
+        if self.read_only:
+            raise Exception("Local ledger is open read-only.")
+        #lines are made durable batch by batch; the in-memory index is snapshotted once at the end,
+        #and anything appended after the last watermark is replayed by recover() after a crash
+        cutoff = datetime.now() - timedelta(seconds=grace)
+        added = 0
+        while True:
+            rows, more = self.fetch_new(conn, batch, cutoff)
+            if not rows:
+                break
+            self.log.seek(0, os.SEEK_END)
+            offset = self.log.tell()
+            for r in rows:
+                line = encode(r)
+                self.log.write(line)
+                self.index(r, offset)
+                offset += len(line)
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            self.last_id = rows[-1]['TransactionID']
+            added += len(rows)
+            if not more:
+                break
+        if added:
+            self.indexed = offset
+            self.tree.flush()
+            self.write_mark()
+        return added
+
+    # history
+    def read_row(self, offset):
+        self.log.seek(offset)
+        return decode(self.log.readline())
+
+    def upper(self, account_id, before_id): #largest key of the account below before_id
+        return ledger_key(account_id, min(ID_MASK, before_id - 1) if before_id is not None else ID_MASK)
+
+    def history(self, account_id, before_id=None, limit=PAGE_SIZE):
+        #keyset page, TransactionID descending, like page_all_transactions
+        if before_id is not None and before_id <= 0:
+            return []
+        scan = self.tree.scan_desc(self.upper(account_id, before_id), account_id << ID_BITS, limit)
+        return [self.read_row(offset) for _, offset in scan]
+
+    def accounts_history(self, account_ids, before_id=None, limit=PAGE_SIZE):
+        #several accounts (one user's) merged newest first; a transfer between two of them is listed once
+        if before_id is not None and before_id <= 0:
+            return []
+        streams = []
+        for account_id in account_ids:
+            hi = self.upper(account_id, before_id)
+            streams.append((-(k & ID_MASK), offset) for k, offset in self.tree.scan_desc(hi, account_id << ID_BITS))
+        rows = []
+        last = None
+        for neg_id, offset in heapq.merge(*streams):
+            if neg_id == last:
+                continue
+            last = neg_id
+            rows.append(self.read_row(offset))
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def close(self):
+        if not self.read_only: #a read-only tree may hold replayed lines or an upgraded header; never written back
+            self.tree.close()
+        self.log.close()
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def main(): #python ledger.py sync [path] | history <account> [limit] [path]
+    args = sys.argv
+    if len(args) > 1 and args[1] == "sync":
+        ledger = LocalLedger(args[2] if len(args) > 2 else "ledger")
+        conn = connect()
+        try:
+            start = time.perf_counter()
+            added = ledger.sync(conn)
+            print(f"Synced {added} transaction(s) in {time.perf_counter()-start:.2f}s, up to #{ledger.last_id}.")
+        finally:
+            conn.close()
+            ledger.close()
+    elif len(args) > 2 and args[1] == "history":
+        ledger = LocalLedger(args[4] if len(args) > 4 else "ledger", read_only=True)
+        try:
+            rows = ledger.history(int(args[2]), limit=int(args[3]) if len(args) > 3 else PAGE_SIZE)
+            for r in rows:
+                print("  ".join(str(r[f]) for f in FIELDS))
+        finally:
+            ledger.close()
+    else:
+        print("usage: python ledger.py sync [path] | history <account> [limit] [path]")
+
+if __name__ == "__main__":
+    main()
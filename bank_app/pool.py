@@ -0,0 +1,101 @@
+import time
+import threading
+from contextlib import contextmanager
+
+import pymysql
+
+from bank import DB_CONFIG
+
+# ------------------------------------------------------------
+# CONNECTION POOL
+# ------------------------------------------------------------
+class ConnectionPool:
+    #at most `size` connections exist at once; get() waits up to `timeout` seconds when all are checked out
+    #connections idle longer than `check_after` seconds are pinged before being handed out again
+    def __init__(self, size=8, config=None, timeout=10, check_after=30):
+        self.size = size
+        self.config = dict(config or DB_CONFIG)
+        self.timeout = timeout
+        self.check_after = check_after
+        self.idle = [] #(conn, last returned), most recently used last
+        self.opened = 0 #idle + checked out
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def get(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.cond:
+                while not self.idle and self.opened >= self.size:
+                    if self.closed:
+                        raise Exception("Connection pool is closed.")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Exception("Timed out waiting for a DB connection.")
+                    self.cond.wait(remaining)
+                if self.closed:
+                    raise Exception("Connection pool is closed.")
+                if self.idle:
+                    conn, returned = self.idle.pop()
+                else:
+                    conn, returned = None, None
+                    self.opened += 1
+
+            if conn is None:
+                try:
+                    return pymysql.connect(**self.config)
+                except Exception:
+                    self.forget()
+                    raise
+
+            if time.monotonic() - returned < self.check_after or self.healthy(conn):
+                return conn
+            self.discard(conn) #dead connection, try the next one
+
+    def put(self, conn):
+        try: #next user always starts from a clean transaction
+            conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+        with self.cond:
+            if not self.closed:
+                self.idle.append((conn, time.monotonic()))
+                self.cond.notify()
+                return
+        self.discard(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.get()
+        try:
+            yield conn
+        finally:
+            self.put(conn)
+
+    def healthy(self, conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self.forget()
+
+    def forget(self): #a connection slot was given up
+        with self.cond:
+            self.opened -= 1
+            self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.cond.notify_all()
+        for conn, _ in idle:
+            self.discard(conn)
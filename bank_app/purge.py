@@ -0,0 +1,166 @@
+import sys
+import time
+import threading
+
+import pymysql
+
+from bank import CLOSED, connect
+
+# ------------------------------------------------------------
+# CHUNKED PURGE OF CLOSED ACCOUNTS
+# ------------------------------------------------------------
+#delete_account only marks the account Closed; this removes its ledger a few rows at a time,
+#committing between chunks so no single transaction holds locks or undo for long
+PURGE_STEPS = [ #(table, order column, account column), each served by an (account column, order column) index
+    ("transaction", "TransactionID", "SourceAccountID"),
+    ("transaction", "TransactionID", "RecipientAccountID"),
+    ("autotransfer", "AutoTransferID", "SourceAccountID"),
+    ("autotransfer", "AutoTransferID", "TargetAccountID"),
+    ("daily_balance", "Day", "AccountID"),
+]
+
+CLOSED_ACCOUNTS = "SELECT AccountID FROM account WHERE Status=%s ORDER BY AccountID LIMIT %s"
+PURGE_CHUNK = "DELETE FROM {table} WHERE {column}=%s ORDER BY {key} LIMIT %s" #one PURGE_STEPS entry
+PURGE_ACCOUNT = "DELETE FROM account WHERE AccountID=%s AND Status=%s"
+
+class Purger:
+    #chunk: rows per DELETE; backs off while InnoDB has more than max_lock_waits waiting row locks
+    #or any replica in replica_configs is more than max_lag seconds behind
+    def __init__(self, conn_factory=connect, chunk=1000, pause=0.01, max_lock_waits=5, max_lag=10,
+                 replica_configs=(), max_backoff=30, idle_sleep=10):
+        self.conn_factory = conn_factory
+        self.chunk = chunk
+        self.pause = pause
+        self.max_lock_waits = max_lock_waits
+        self.max_lag = max_lag
+        self.replica_configs = list(replica_configs)
+        self.replicas = []
+        self.max_backoff = max_backoff
+        self.idle_sleep = idle_sleep
+        self.stopped = threading.Event()
+        self.thread = None
+        self.deleted = 0
+        self.throttled = 0.0 #seconds spent backing off
+
+    # load signals
+    def lock_waits(self, conn):
+        with conn.cursor() as cur:
+            cur.execute("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_current_waits'")
+            row = cur.fetchone()
+        return int(row['Value']) if row else 0
+
+    def replica_lag(self):
+        if len(self.replicas) < len(self.replica_configs): #kept open between checks
+            self.replicas = [pymysql.connect(**config) for config in self.replica_configs]
+        lag = 0
+        for replica in self.replicas:
+            with replica.cursor(pymysql.cursors.DictCursor) as cur:
+                try:
+                    cur.execute("SHOW REPLICA STATUS")
+                except pymysql.err.ProgrammingError: #servers before 8.0.22
+                    cur.execute("SHOW SLAVE STATUS")
+                row = cur.fetchone() or {}
+            seconds = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+            if seconds is None and row: #replication stopped
+                return float('inf')
+            lag = max(lag, seconds or 0)
+        return lag
+
+    def throttle(self, conn):
+        delay = self.pause
+        while not self.stopped.is_set():
+            if self.lock_waits(conn) <= self.max_lock_waits and self.replica_lag() <= self.max_lag:
+                break
+            self.stopped.wait(delay)
+            self.throttled += delay
+            delay = min(self.max_backoff, delay*2)
+        self.stopped.wait(self.pause)
+
+    # purge
+    def closed_accounts(self, conn, limit=100):
+        with conn.cursor() as cur:
+            cur.execute(CLOSED_ACCOUNTS, (CLOSED, limit))
+            rows = cur.fetchall()
+        conn.commit()
+        return [r['AccountID'] for r in rows]
+
+    def purge_account(self, conn, account_id): #returns False if stopped part-way; rerunning continues where it left off
+        for table, key, column in PURGE_STEPS:
+            while True:
+                if self.stopped.is_set():
+                    return False
+                self.throttle(conn)
+                with conn.cursor() as cur:
+                    cur.execute(PURGE_CHUNK.format(table=table, column=column, key=key), (account_id, self.chunk))
+                    deleted = cur.rowcount
+                conn.commit()
+                self.deleted += deleted
+                if deleted < self.chunk:
+                    break
+        with conn.cursor() as cur:
+            cur.execute(PURGE_ACCOUNT, (account_id, CLOSED))
+        conn.commit()
+        return True
+
+    def run_once(self): #purges every account closed so far; returns how many were finished
+        conn = self.conn_factory()
+        done = 0
+        try:
+            while not self.stopped.is_set():
+                accounts = self.closed_accounts(conn)
+                if not accounts:
+                    break
+                for account_id in accounts:
+                    if not self.purge_account(conn, account_id):
+                        return done
+                    done += 1
+        finally:
+            conn.close()
+            for replica in self.replicas:
+                replica.close()
+            self.replicas = []
+        return done
+
+    # background thread
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print("Purge failed:", e)
+            self.stopped.wait(self.idle_sleep)
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="purger", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def main(): #python purge.py [--once] [chunk]
+    args = [a for a in sys.argv[1:] if a != "--once"]
+    once = "--once" in sys.argv
+    purger = Purger(chunk=int(args[0]) if args else 1000)
+
+    if once:
+        start = time.perf_counter()
+        done = purger.run_once()
+        print(f"Purged {done} account(s), {purger.deleted} row(s) in {time.perf_counter()-start:.1f}s "
+              f"({purger.throttled:.1f}s throttled)")
+        return
+
+    purger.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        purger.stop()
+
+if __name__ == "__main__":
+    main()
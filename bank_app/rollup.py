@@ -0,0 +1,355 @@
+import sys
+from datetime import datetime, date, timedelta
+
+from bank import money, connect, CLOSED
+
+# ------------------------------------------------------------
+# TABLES
+# ------------------------------------------------------------
+#one row per account per day with activity: the closing Balance of that day and the day's totals
+#the first row of an account is its opening balance on the day it was created (Entries 0)
+DAILY_BALANCE_DDL = """
+    CREATE TABLE IF NOT EXISTS daily_balance (
+        AccountID INT NOT NULL,
+        Day DATE NOT NULL,
+        Balance DECIMAL(15,2) NOT NULL,
+        Credits DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+        Debits DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+        Entries INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (AccountID, Day)
+    )
+"""
+
+#how far the rollup got: every transaction up to LastTransactionID and every account up to LastAccountID
+#is in daily_balance, and so is every transaction created before Through
+WATERMARK_DDL = """
+    CREATE TABLE IF NOT EXISTS rollup_watermark (
+        Name VARCHAR(40) NOT NULL,
+        LastTransactionID BIGINT NOT NULL DEFAULT 0,
+        LastAccountID INT NOT NULL DEFAULT 0,
+        Through DATETIME NULL,
+        PRIMARY KEY (Name)
+    )
+"""
+
+WATERMARK = "daily_balance"
+GRACE = 60 #seconds; rows newer than this may still have lower-id siblings waiting to commit
+ZERO = money(0)
+
+def midnight(day):
+    return datetime.combine(day, datetime.min.time())
+
+# ------------------------------------------------------------
+# LEDGER EFFECTS
+# ------------------------------------------------------------
+#Deposit adds to SourceAccountID, Withdraw takes from it, Transfer moves Amount from Source to Recipient
+def effects(row):
+    amount = money(row['Amount'])
+    if row['Type'] == 'Deposit':
+        return [(row['SourceAccountID'], amount)]
+    if row['Type'] == 'Withdraw':
+        return [(row['SourceAccountID'], -amount)]
+    return [(row['SourceAccountID'], -amount), (row['RecipientAccountID'], amount)]
+
+NET_CHANGE = """
+    SELECT
+        (SELECT COALESCE(SUM(CASE WHEN Type='Deposit' THEN Amount ELSE -Amount END), 0)
+         FROM transaction WHERE SourceAccountID=%s{bounds}) AS outgoing,
+        (SELECT COALESCE(SUM(Amount), 0)
+         FROM transaction WHERE RecipientAccountID=%s{bounds}) AS incoming
+"""
+
+def net_change(conn, account_id, since=None, until=None):
+    #sum of the account's ledger effects with since <= CreatedTime < until, off the (account, CreatedTime) indexes
+    bounds = ""
+    args = []
+    if since is not None:
+        bounds += " AND CreatedTime >= %s"
+        args.append(since)
+    if until is not None:
+        bounds += " AND CreatedTime < %s"
+        args.append(until)
+    with conn.cursor() as cur:
+        cur.execute(NET_CHANGE.format(bounds=bounds), (account_id, *args, account_id, *args))
+        row = cur.fetchone()
+    return money(row['outgoing']) + money(row['incoming'])
+
+# ------------------------------------------------------------
+# ROLLUP
+# ------------------------------------------------------------
+LOCK_WATERMARK = """
+    SELECT LastTransactionID, LastAccountID, Through
+    FROM rollup_watermark
+    WHERE Name=%s
+    FOR UPDATE
+"""
+
+def lock_watermark(cur):
+    cur.execute("INSERT IGNORE INTO rollup_watermark (Name) VALUES (%s)", (WATERMARK,))
+    cur.execute(LOCK_WATERMARK, (WATERMARK,)) #one rollup at a time; taken before any plain read so the snapshot starts after it
+    return cur.fetchone()
+
+NEW_ACCOUNTS = """
+    SELECT AccountID, Balance, Status, CreatedTime
+    FROM account
+    WHERE AccountID > %s
+    ORDER BY AccountID
+    LIMIT %s
+"""
+SET_SEEDED = "UPDATE rollup_watermark SET LastAccountID=%s WHERE Name=%s"
+
+def seed_accounts(conn, cur, mark, cutoff, limit):
+    #opening row for accounts the rollup has not seen yet: current Balance minus every ledger effect visible
+    #in the same snapshot, so rolling those transactions up afterwards lands exactly on Balance
+    cur.execute(NEW_ACCOUNTS, (mark['LastAccountID'], limit))
+    rows = cur.fetchall()
+    taken = []
+    for r in rows:
+        if r['CreatedTime'] >= cutoff:
+            break
+        taken.append(r)
+    if not taken:
+        return 0, False
+
+    openings = [(r['AccountID'], r['CreatedTime'].date(), money(r['Balance']) - net_change(conn, r['AccountID']))
+                for r in taken if r['Status'] != CLOSED]
+    if openings:
+        cur.executemany("INSERT INTO daily_balance (AccountID, Day, Balance) VALUES (%s, %s, %s)", openings)
+    cur.execute(SET_SEEDED, (taken[-1]['AccountID'], WATERMARK))
+    return len(openings), len(taken) == limit
+
+SNAPSHOT_BEFORE = """
+    SELECT Day, Balance FROM daily_balance
+    WHERE AccountID=%s AND Day<%s
+    ORDER BY Day DESC
+    LIMIT 1
+"""
+LOCK_DAYS_FROM = """
+    SELECT Day, Balance FROM daily_balance
+    WHERE AccountID=%s AND Day>=%s
+    ORDER BY Day
+    FOR UPDATE
+"""
+
+def apply_days(cur, account_id, days):
+    #days: {day: [net, credits, debits, entries]} from this batch; rows already past the first day
+    #(late transactions) move by the same net as well
+    first = min(days)
+    cur.execute(SNAPSHOT_BEFORE, (account_id, first))
+    row = cur.fetchone()
+    balance = money(row['Balance']) if row else ZERO
+    cur.execute(LOCK_DAYS_FROM, (account_id, first))
+    existing = {r['Day']: money(r['Balance']) for r in cur.fetchall()}
+
+    rows = []
+    moved = ZERO
+    for day in sorted(set(days) | set(existing)):
+        net, credits, debits, entries = days.get(day, (ZERO, ZERO, ZERO, 0))
+        moved += net
+        balance = existing.get(day, balance)
+        rows.append((account_id, day, balance + moved, credits, debits, entries))
+    cur.executemany("""
+        INSERT INTO daily_balance (AccountID, Day, Balance, Credits, Debits, Entries)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            Balance=VALUES(Balance), Credits=Credits+VALUES(Credits),
+            Debits=Debits+VALUES(Debits), Entries=Entries+VALUES(Entries)
+    """, rows)
+
+NEW_TRANSACTIONS = """
+    SELECT TransactionID, SourceAccountID, RecipientAccountID, Type, Amount, CreatedTime
+    FROM transaction
+    WHERE TransactionID > %s
+    ORDER BY TransactionID
+    LIMIT %s
+"""
+OPEN_ACCOUNTS = """
+    SELECT AccountID FROM account
+    WHERE AccountID IN ({marks}) AND Status<>%s
+    ORDER BY AccountID
+"""
+SET_THROUGH = "UPDATE rollup_watermark SET Through=%s WHERE Name=%s"
+SET_ROLLED = "UPDATE rollup_watermark SET LastTransactionID=%s, Through=%s WHERE Name=%s"
+
+def roll_transactions(cur, mark, cutoff, limit):
+    #next page of transactions past the watermark, up to the first one inside the grace window
+    cur.execute(NEW_TRANSACTIONS, (mark['LastTransactionID'], limit))
+    rows = cur.fetchall()
+    taken = []
+    for r in rows:
+        if r['CreatedTime'] >= cutoff:
+            break
+        taken.append(r)
+    more = len(taken) == limit
+    through = taken[-1]['CreatedTime'] if more else cutoff
+    if not taken:
+        cur.execute(SET_THROUGH, (through, WATERMARK))
+        return 0, False
+
+    days = {} #account -> day -> [net, credits, debits, entries]
+    for r in taken:
+        for account_id, amount in effects(r):
+            day = days.setdefault(account_id, {}).setdefault(r['CreatedTime'].date(), [ZERO, ZERO, ZERO, 0])
+            day[0] += amount
+            day[1 if amount > 0 else 2] += abs(amount)
+            day[3] += 1
+
+    accounts = sorted(days)
+    cur.execute(OPEN_ACCOUNTS.format(marks=",".join(["%s"]*len(accounts))), (*accounts, CLOSED))
+    for r in cur.fetchall(): #closed accounts are left to purge.py
+        apply_days(cur, r['AccountID'], days[r['AccountID']])
+
+    cur.execute(SET_ROLLED, (taken[-1]['TransactionID'], through, WATERMARK))
+    return len(taken), more
+
+def rollup_batch(conn, cutoff, limit=1000):
+    #one DB transaction: seed a page of new accounts, or (once they are all seeded) roll up a page of
+    #transactions; returns (accounts seeded, transactions rolled, more left)
+    try:
+        with conn.cursor() as cur:
+            conn.begin()
+            mark = lock_watermark(cur)
+            seeded, more = seed_accounts(conn, cur, mark, cutoff, limit)
+            rolled = 0
+            if not more:
+                rolled, more = roll_transactions(cur, mark, cutoff, limit)
+            conn.commit()
+            return seeded, rolled, more
+    except Exception:
+        conn.rollback()
+        raise
+
+def rollup(conn, limit=1000, grace=GRACE, now=None):
+    #incremental: picks up after the watermark and stops at now - grace
+    cutoff = (now or datetime.now()) - timedelta(seconds=grace)
+    seeded = rolled = 0
+    while True:
+        s, r, more = rollup_batch(conn, cutoff, limit)
+        seeded += s
+        rolled += r
+        if not more:
+            return seeded, rolled
+
+# ------------------------------------------------------------
+# STATEMENTS
+# ------------------------------------------------------------
+ROLLED_THROUGH = "SELECT Through FROM rollup_watermark WHERE Name=%s"
+ACCOUNT_BALANCE = "SELECT Balance FROM account WHERE AccountID=%s"
+
+def rolled_through(conn): #days before this date are complete in daily_balance
+    with conn.cursor() as cur:
+        cur.execute(ROLLED_THROUGH, (WATERMARK,))
+        row = cur.fetchone()
+    return row['Through'].date() if row and row['Through'] else date.min
+
+def balance_before(conn, account_id, until, through=None):
+    #balance just before until: nearest complete snapshot plus the transactions after it,
+    #or, with no snapshot, the current Balance minus everything since until
+    through = through or rolled_through(conn)
+    with conn.cursor() as cur:
+        cur.execute(SNAPSHOT_BEFORE, (account_id, min(until.date(), through)))
+        snap = cur.fetchone()
+        if snap:
+            after = midnight(snap['Day']) + timedelta(days=1)
+            return money(snap['Balance']) + net_change(conn, account_id, after, until)
+        cur.execute(ACCOUNT_BALANCE, (account_id,))
+        row = cur.fetchone()
+    if not row:
+        raise Exception("Account not found.")
+    return money(row['Balance']) - net_change(conn, account_id, until)
+
+def balance_at(conn, account_id, day): #closing balance of day
+    try:
+        return balance_before(conn, account_id, midnight(day) + timedelta(days=1))
+    finally:
+        conn.rollback() #reads above share one snapshot; end it
+
+RECENT_TRANSACTIONS = """
+    SELECT TransactionID, SourceAccountID, RecipientAccountID, Type, Amount, CreatedTime
+    FROM transaction WHERE SourceAccountID=%s AND CreatedTime>=%s AND CreatedTime<%s
+    UNION
+    SELECT TransactionID, SourceAccountID, RecipientAccountID, Type, Amount, CreatedTime
+    FROM transaction WHERE RecipientAccountID=%s AND CreatedTime>=%s AND CreatedTime<%s
+"""
+
+def recent_days(conn, account_id, since, until):
+    #per-day totals straight from transaction, for days the rollup has not completed yet
+    with conn.cursor() as cur:
+        cur.execute(RECENT_TRANSACTIONS, (account_id, since, until, account_id, since, until))
+        rows = cur.fetchall()
+    days = {}
+    for r in rows:
+        for target, amount in effects(r):
+            if target != account_id:
+                continue
+            day = days.setdefault(r['CreatedTime'].date(), [ZERO, ZERO, ZERO, 0])
+            day[0] += amount
+            day[1 if amount > 0 else 2] += abs(amount)
+            day[3] += 1
+    return days
+
+STATEMENT_DAYS = """
+    SELECT Day, Balance, Credits, Debits, Entries
+    FROM daily_balance
+    WHERE AccountID=%s AND Day>=%s AND Day<=%s AND Day<%s AND Entries>0
+    ORDER BY Day
+"""
+
+def statement(conn, account_id, start, end):
+    #start..end inclusive: opening and closing balance, totals and one row per day with activity
+    #complete days come from daily_balance, only the days after the watermark touch transaction
+    try:
+        through = rolled_through(conn)
+        opening = balance_before(conn, account_id, midnight(start), through)
+
+        with conn.cursor() as cur:
+            cur.execute(STATEMENT_DAYS, (account_id, start, end, through))
+            days = [dict(r, Balance=money(r['Balance']), Credits=money(r['Credits']), Debits=money(r['Debits']))
+                    for r in cur.fetchall()]
+
+        tail = max(start, through)
+        if tail <= end:
+            balance = days[-1]['Balance'] if days else balance_before(conn, account_id, midnight(tail), through)
+            recent = recent_days(conn, account_id, midnight(tail), midnight(end) + timedelta(days=1))
+            for day in sorted(recent):
+                net, credits, debits, entries = recent[day]
+                balance += net
+                days.append({"Day": day, "Balance": balance, "Credits": credits, "Debits": debits, "Entries": entries})
+    finally:
+        conn.rollback()
+
+    return {
+        "AccountID": account_id, "Start": start, "End": end,
+        "Opening": opening, "Closing": days[-1]['Balance'] if days else opening,
+        "Credits": sum((d['Credits'] for d in days), ZERO), "Debits": sum((d['Debits'] for d in days), ZERO),
+        "Days": days,
+    }
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def main(): #python rollup.py run [batch] | balance <account> <YYYY-MM-DD> | statement <account> <start> <end>
+    args = sys.argv
+    day = lambda s: datetime.strptime(s, "%Y-%m-%d").date()
+    if len(args) < 2 or args[1] not in ("run", "balance", "statement"):
+        print("usage: python rollup.py run [batch] | balance <account> <YYYY-MM-DD> | statement <account> <start> <end>")
+        return
+
+    conn = connect()
+    try:
+        if args[1] == "run":
+            seeded, rolled = rollup(conn, int(args[2]) if len(args) > 2 else 1000)
+            print(f"Seeded {seeded} account(s), rolled up {rolled} transaction(s).")
+        elif args[1] == "balance":
+            print(balance_at(conn, int(args[2]), day(args[3])))
+        else:
+            s = statement(conn, int(args[2]), day(args[3]), day(args[4]))
+            print(f"Account {s['AccountID']}  {s['Start']} .. {s['End']}")
+            print(f"Opening {s['Opening']}  Credits {s['Credits']}  Debits {s['Debits']}  Closing {s['Closing']}\n")
+            for d in s['Days']:
+                print(f"{d['Day']}  +{d['Credits']:>12}  -{d['Debits']:>12}  {d['Balance']:>14}  ({d['Entries']})")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import sys
+
+from bank import connect
+from search import NGRAM_DDL
+from rollup import DAILY_BALANCE_DDL, WATERMARK_DDL
+
+# ------------------------------------------------------------
+# TABLES
+# ------------------------------------------------------------
+#indexes follow the predicates bank.py actually runs:
+#  user(Email) login and exact search, user(FName)/(LName) prefix search
+#  account(UserID) every per-user list, account(Status) purge.py finding closed accounts
+#  transaction(SourceAccountID, ...)/(RecipientAccountID, ...) per-account history and the purge.py chunked deletes,
+#    the CreatedTime variants rollup.py summing the transactions after a daily_balance snapshot
+#  autotransfer(TransferDate) due-transfer scan, (SourceAccountID)/(TargetAccountID) per-account lookups;
+#    DayOfMonth keeps the first TransferDate's day, so monthly schedules return to it after a short month
+TABLES = [
+    ("user", """
+        CREATE TABLE IF NOT EXISTS user (
+            UserID INT NOT NULL AUTO_INCREMENT,
+            FName VARCHAR(50) NOT NULL,
+            Minit CHAR(1) NULL,
+            LName VARCHAR(50) NOT NULL,
+            Birthday DATE NULL,
+            Email VARCHAR(100) NOT NULL,
+            Password VARCHAR(255) NOT NULL,
+            PhoneNumber VARCHAR(20) NULL,
+            CreatedTime DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (UserID),
+            UNIQUE KEY uq_user_email (Email),
+            KEY idx_user_fname (FName),
+            KEY idx_user_lname (LName)
+        )
+    """),
+    ("admin", """
+        CREATE TABLE IF NOT EXISTS admin (
+            AdminID INT NOT NULL AUTO_INCREMENT,
+            FName VARCHAR(50) NOT NULL,
+            LName VARCHAR(50) NOT NULL,
+            Email VARCHAR(100) NOT NULL,
+            Password VARCHAR(255) NOT NULL,
+            CreatedTime DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (AdminID),
+            UNIQUE KEY uq_admin_email (Email)
+        )
+    """),
+    ("account", """
+        CREATE TABLE IF NOT EXISTS account (
+            AccountID INT NOT NULL AUTO_INCREMENT,
+            UserID INT NOT NULL,
+            AdminID INT NULL,
+            Balance DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+            AccountType VARCHAR(40) NOT NULL DEFAULT 'Checking Account',
+            Status VARCHAR(20) NOT NULL DEFAULT 'Active',
+            CreatedTime DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (AccountID),
+            KEY idx_account_user (UserID, AccountID),
+            KEY idx_account_status (Status, AccountID),
+            CONSTRAINT fk_account_user FOREIGN KEY (UserID) REFERENCES user (UserID),
+            CONSTRAINT fk_account_admin FOREIGN KEY (AdminID) REFERENCES admin (AdminID)
+        )
+    """),
+    ("transaction", """
+        CREATE TABLE IF NOT EXISTS `transaction` (
+            TransactionID BIGINT NOT NULL AUTO_INCREMENT,
+            SourceAccountID INT NOT NULL,
+            RecipientAccountID INT NULL,
+            Type ENUM('Deposit', 'Withdraw', 'Transfer') NOT NULL,
+            Amount DECIMAL(15,2) NOT NULL,
+            Description VARCHAR(255) NULL,
+            CreatedTime DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (TransactionID),
+            KEY idx_transaction_source (SourceAccountID, TransactionID),
+            KEY idx_transaction_recipient (RecipientAccountID, TransactionID),
+            KEY idx_transaction_source_time (SourceAccountID, CreatedTime),
+            KEY idx_transaction_recipient_time (RecipientAccountID, CreatedTime)
+        )
+    """),
+    ("autotransfer", """
+        CREATE TABLE IF NOT EXISTS autotransfer (
+            AutoTransferID INT NOT NULL AUTO_INCREMENT,
+            SourceAccountID INT NOT NULL,
+            TargetAccountID INT NOT NULL,
+            Amount DECIMAL(15,2) NOT NULL,
+            Frequency VARCHAR(20) NOT NULL,
+            TransferDate DATETIME NOT NULL,
+            DayOfMonth TINYINT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (AutoTransferID),
+            KEY idx_autotransfer_date (TransferDate, AutoTransferID),
+            KEY idx_autotransfer_source (SourceAccountID),
+            KEY idx_autotransfer_target (TargetAccountID)
+        )
+    """),
+    ("user_ngram", NGRAM_DDL),
+    ("daily_balance", DAILY_BALANCE_DDL),
+    ("rollup_watermark", WATERMARK_DDL),
+]
+
+#columns added after their table: CREATE TABLE IF NOT EXISTS leaves an existing table as it is, so
+#create_schema adds whatever is missing (table, column, statements run once when it is added)
+COLUMNS = [
+    ("autotransfer", "DayOfMonth", [
+        "ALTER TABLE autotransfer ADD COLUMN DayOfMonth TINYINT NULL AFTER TransferDate",
+        #best guess for existing rows: a schedule already clamped to a short month stays on that day
+        "UPDATE autotransfer SET DayOfMonth = DAYOFMONTH(TransferDate) WHERE DayOfMonth IS NULL",
+    ]),
+]
+
+def missing_column(cur, table, column):
+    cur.execute("""
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cur.fetchone() is None
+
+def create_schema(conn): #also brings tables created by an earlier version up to date
+    with conn.cursor() as cur:
+        for _, ddl in TABLES:
+            cur.execute(ddl)
+        for table, column, statements in COLUMNS:
+            if missing_column(cur, table, column):
+                for sql in statements:
+                    cur.execute(sql)
+    conn.commit()
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def main(): #python schema.py create
+    args = sys.argv
+    if len(args) < 2 or args[1] != "create":
+        print("usage: python schema.py create")
+        return
+
+    conn = connect()
+    try:
+        create_schema(conn)
+        print("Schema created.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
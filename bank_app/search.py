@@ -0,0 +1,179 @@
+import sys
+
+# ------------------------------------------------------------
+# TRIGRAM INDEX (user_ngram side table)
+# ------------------------------------------------------------
+#every lowercase 3-character substring of FName, LName and Email, kept in sync by create_user,
+#so substring search is an index lookup on Gram instead of three leading-wildcard LIKE scans over user.
+#Grams holding whitespace are left out on both sides: CHAR(3) drops trailing spaces, so they could never match
+NGRAM_DDL = """
+    CREATE TABLE IF NOT EXISTS user_ngram (
+        Gram CHAR(3) NOT NULL,
+        UserID INT NOT NULL,
+        PRIMARY KEY (Gram, UserID),
+        KEY idx_user_ngram_user (UserID)
+    )
+"""
+
+N = 3
+SEARCH_LIMIT = 20
+
+def grams(text):
+    text = (text or "").lower()
+    return {g for g in (text[i:i+N] for i in range(len(text)-N+1)) if not any(c.isspace() for c in g)}
+
+def user_grams(fname, lname, email):
+    return grams(fname) | grams(lname) | grams(email)
+
+def index_user(cur, user_id, fname, lname, email): #call inside the transaction that writes the user row
+    rows = [(g, user_id) for g in sorted(user_grams(fname, lname, email))]
+    if rows:
+        cur.executemany("INSERT IGNORE INTO user_ngram (Gram, UserID) VALUES (%s, %s)", rows)
+
+def create_ngram_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(NGRAM_DDL)
+    conn.commit()
+
+REBUILD_PAGE = """
+    SELECT UserID, FName, LName, Email
+    FROM user
+    WHERE UserID > %s
+    ORDER BY UserID
+    LIMIT %s
+"""
+
+def rebuild_index(conn, batch=1000): #backfill for users created before the side table existed
+    last = 0
+    total = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(REBUILD_PAGE, (last, batch))
+            users = cur.fetchall()
+            if not users:
+                break
+            cur.execute(f"DELETE FROM user_ngram WHERE UserID IN ({','.join(['%s']*len(users))})",
+                        [u['UserID'] for u in users])
+            for u in users:
+                index_user(cur, u['UserID'], u['FName'], u['LName'], u['Email'])
+        conn.commit()
+        total += len(users)
+        last = users[-1]['UserID']
+    return total
+
+# ------------------------------------------------------------
+# SEARCH
+# ------------------------------------------------------------
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+EXACT_EMAIL = "SELECT * FROM user WHERE Email = %s"
+
+def search_exact_email(conn, email):
+    with conn.cursor() as cur:
+        cur.execute(EXACT_EMAIL, (email,))
+        return cur.fetchall()
+
+def prefix_query(key, limit=SEARCH_LIMIT, after_id=0):
+    #one index range scan per column (FName, LName, Email indexes), merged and paged by UserID
+    prefix = escape_like(key) + "%"
+    return """
+        SELECT * FROM (
+            SELECT * FROM user WHERE FName LIKE %s
+            UNION
+            SELECT * FROM user WHERE LName LIKE %s
+            UNION
+            SELECT * FROM user WHERE Email LIKE %s
+        ) u
+        WHERE u.UserID > %s
+        ORDER BY u.UserID
+        LIMIT %s
+    """, (prefix, prefix, prefix, after_id, limit)
+
+def search_prefix(conn, key, limit=SEARCH_LIMIT, after_id=0):
+    with conn.cursor() as cur:
+        cur.execute(*prefix_query(key, limit, after_id))
+        return cur.fetchall()
+
+def substring_query(key, limit=SEARCH_LIMIT, after_id=0):
+    #key is split into words ("li na" -> li, na), each of which has to be in FName, LName or Email:
+    #as a substring when it has trigrams, as a prefix when it is shorter. Candidates come from an index either way:
+    #users holding every trigram of the long words, or else the prefix scans for the first word;
+    #LIKE on just those rows drops false positives
+    words = key.split()
+    key_grams = sorted(set().union(*(grams(w) for w in words)))
+    if key_grams:
+        candidates = f"""
+            SELECT UserID
+            FROM user_ngram
+            WHERE Gram IN ({",".join(["%s"]*len(key_grams))})
+              AND UserID > %s
+            GROUP BY UserID
+            HAVING COUNT(*) = %s
+        """
+        args = [*key_grams, after_id, len(key_grams)]
+    else:
+        candidates = """
+            SELECT UserID FROM user WHERE FName LIKE %s AND UserID > %s
+            UNION
+            SELECT UserID FROM user WHERE LName LIKE %s AND UserID > %s
+            UNION
+            SELECT UserID FROM user WHERE Email LIKE %s AND UserID > %s
+        """
+        prefix = escape_like(words[0]) + "%"
+        args = [prefix, after_id]*3
+    matches = []
+    for w in words:
+        pattern = ("%" if len(w) >= N else "") + escape_like(w) + "%"
+        matches.append("(u.FName LIKE %s OR u.LName LIKE %s OR u.Email LIKE %s)")
+        args += [pattern]*3
+    return f"""
+        SELECT u.*
+        FROM user u
+        JOIN ({candidates}) c ON c.UserID = u.UserID
+        WHERE {" AND ".join(matches)}
+        ORDER BY u.UserID
+        LIMIT %s
+    """, (*args, limit)
+
+def search_substring(conn, key, limit=SEARCH_LIMIT, after_id=0):
+    if len(key) < N:
+        return search_prefix(conn, key, limit, after_id)
+    with conn.cursor() as cur:
+        cur.execute(*substring_query(key, limit, after_id))
+        return cur.fetchall()
+
+def search_users(conn, key, mode="auto", limit=SEARCH_LIMIT, after_id=0):
+    #mode: "email" exact, "prefix", "substring", or "auto" (exact email if it looks like one, else substring)
+    key = key.strip()
+    if not key:
+        return []
+    if mode == "email":
+        return search_exact_email(conn, key) if after_id == 0 else []
+    if mode == "prefix":
+        return search_prefix(conn, key, limit, after_id)
+    if mode == "auto" and "@" in key and after_id == 0:
+        rows = search_exact_email(conn, key)
+        if rows:
+            return rows
+    return search_substring(conn, key.lower(), limit, after_id)
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def main(): #python search.py rebuild
+    from bank import connect
+
+    args = sys.argv
+    if len(args) > 1 and args[1] == "rebuild":
+        conn = connect()
+        try:
+            create_ngram_table(conn)
+            print(f"Indexed {rebuild_index(conn)} user(s).")
+        finally:
+            conn.close()
+    else:
+        print("usage: python search.py rebuild")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+from bank import (
+    create_user_tx, find_user, find_admin, create_account_tx, delete_account_tx,
+    deposit_tx, withdraw_tx, create_autotransfer_tx,
+    fetch_user_accounts, fetch_user_transactions, fetch_user_autotransfers, fetch_user_name, cache,
+)
+from pool import ConnectionPool
+from hot import HotAccountRouter, transfer_with_retry
+from rollup import balance_at, statement
+
+# ------------------------------------------------------------
+# SERVICE LAYER
+# ------------------------------------------------------------
+class BankService:
+    #safe to share between threads: every call checks out its own pooled connection
+    #write methods raise on failure (after rolling back) instead of printing
+    #writes to hot_accounts go through per-account writer queues, other transfers retry on lock errors
+    def __init__(self, pool=None, hot_accounts=(), retries=3, backoff=0.05):
+        self.pool = pool or ConnectionPool()
+        self.retries = retries
+        self.backoff = backoff
+        self.hot = HotAccountRouter(self.pool, hot_accounts, retries=retries, backoff=backoff)
+
+    def close(self):
+        self.hot.close()
+        self.pool.close()
+
+    # users
+    def create_user(self, fname, minit, lname, birthday, email, password, phone):
+        with self.pool.connection() as conn:
+            return create_user_tx(conn, fname, minit, lname, birthday, email, password, phone)
+
+    def login_user(self, email, password):
+        with self.pool.connection() as conn:
+            return find_user(conn, email, password)
+
+    def login_admin(self, email, password):
+        with self.pool.connection() as conn:
+            return find_admin(conn, email, password)
+
+    # accounts
+    def create_account(self, user_id, init_balance, admin_id, account_type):
+        with self.pool.connection() as conn:
+            return create_account_tx(conn, user_id, init_balance, admin_id, account_type)
+
+    def delete_account(self, account_id, user_id):
+        with self.pool.connection() as conn:
+            delete_account_tx(conn, account_id, user_id)
+
+    # transactions
+    def deposit(self, account_id, amount, desc=None):
+        if self.hot.is_hot(account_id):
+            return self.hot.deposit(account_id, amount, desc)
+        with self.pool.connection() as conn:
+            return deposit_tx(conn, account_id, amount, desc)
+
+    def withdraw(self, account_id, amount, desc=None):
+        if self.hot.is_hot(account_id):
+            return self.hot.withdraw(account_id, amount, desc)
+        with self.pool.connection() as conn:
+            return withdraw_tx(conn, account_id, amount, desc)
+
+    def transfer(self, source_id, target_id, amount, desc=None):
+        if self.hot.is_hot(source_id) or self.hot.is_hot(target_id):
+            self.hot.transfer(source_id, target_id, amount, desc)
+            return
+        with self.pool.connection() as conn:
+            transfer_with_retry(conn, source_id, target_id, amount, desc, self.retries, self.backoff)
+
+    def create_autotransfer(self, source, target, amount, frequency, date):
+        with self.pool.connection() as conn:
+            return create_autotransfer_tx(conn, source, target, amount, frequency, date)
+
+    # lists
+    def user_accounts(self, user_id):
+        with self.pool.connection() as conn:
+            return fetch_user_accounts(conn, user_id)
+
+    def user_transactions(self, user_id):
+        with self.pool.connection() as conn:
+            return fetch_user_transactions(conn, user_id)
+
+    def user_autotransfers(self, user_id):
+        with self.pool.connection() as conn:
+            return fetch_user_autotransfers(conn, user_id)
+
+    def user_name(self, user_id):
+        with self.pool.connection() as conn:
+            return fetch_user_name(conn, user_id)
+
+    # statements (daily_balance snapshots kept by rollup.py)
+    def balance_at(self, account_id, day):
+        with self.pool.connection() as conn:
+            return balance_at(conn, account_id, day)
+
+    def statement(self, account_id, start, end):
+        with self.pool.connection() as conn:
+            return statement(conn, account_id, start, end)
+
+    def cache_stats(self): #hits, misses, hit_rate, evictions, invalidations, size
+        return cache.stats()
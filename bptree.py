@@ -2,9 +2,15 @@ import sys
 import os
 import bisect
 import struct
-import math 
 
 SIZE_OF_INT = 4
+HEADER_FORMAT = "iiiiiii" #b, root offset, page size, height, entry count, free-list head, key format
+KEY_FORMATS = ["i", "q"] #struct format of keys and values: 0 = 4-byte (files before this field read as 0), 1 = 8-byte
+FREE_PAGE = 2 #first byte of a page on the free list (leaf = 1, internal = 0)
+
+def node_size(b, fmt): #bytes of the largest node of order b: a leaf or internal node holding b-1 keys
+    k = struct.calcsize(fmt)
+    return max(1 + 4 + (b-1)*2*k + 2*SIZE_OF_INT, 1 + 4 + (b-1)*k + b*SIZE_OF_INT + SIZE_OF_INT)
 
 class bptreenode:
     def __init__(self, leaf, b):
@@ -14,11 +20,12 @@ class bptreenode:
         self.values= [] 
         self.children = [] 
         self.right = None 
+        self.left = None #leaf only
 
     def is_full(self):
         return len(self.keys) >= self.b-1 #max
     
-    def byte_to_dat(self): #converts bptreenode to bytes to be written in .dat file
+    def byte_to_dat(self, fmt="i"): #converts bptreenode to bytes to be written in .dat file, fmt for keys/values
         data = bytearray()
         if self.is_leaf == True:
             data.append(1)
@@ -26,14 +33,18 @@ class bptreenode:
             data.append(0)
         data+=struct.pack("i", len(self.keys))
         for key in self.keys:
-            data+= struct.pack("i",key)
+            data+= struct.pack(fmt,key)
         if self.is_leaf:
             for value in self.values:
-                data+= struct.pack("i",value)
+                data+= struct.pack(fmt,value)
             if self.right is not None:
                 data+= struct.pack("i",self.right)
             else:
                 data+= struct.pack("i",-1)
+            if self.left is not None:
+                data+= struct.pack("i",self.left)
+            else:
+                data+= struct.pack("i",-1)
         else:
             for child in self.children:
                 if child is not None:
@@ -47,30 +58,37 @@ class bptreenode:
         return bytes(data)
     
     @staticmethod
-    def dat_to_byte(data,b): #converts bytes in .dat file to bptreenode
+    def dat_to_byte(data,b,fmt="i"): #converts bytes in .dat file to bptreenode
         is_leaf = data[0] ==1
+        size = struct.calcsize(fmt)
         offset = 1
         m = struct.unpack("i", data[offset:offset+4])[0]
         offset+=4
         keys = []
 
         for i in range(m):
-            keys.append(struct.unpack("i", data[offset:offset+4])[0])
-            offset+=4
+            keys.append(struct.unpack(fmt, data[offset:offset+size])[0])
+            offset+=size
         node = bptreenode(is_leaf,b)
         node.keys = keys
 
         if is_leaf == True:
             values = []
             for i in range(m):
-                values.append(struct.unpack("i", data[offset:offset+4])[0])
-                offset +=4
+                values.append(struct.unpack(fmt, data[offset:offset+size])[0])
+                offset +=size
             node.values = values
             right_pointer = struct.unpack("i", data[offset:offset+4])[0]
             if right_pointer == -1:
                 node.right = None
             else:
                 node.right = right_pointer
+            offset+=4
+            left_pointer = struct.unpack("i", data[offset:offset+4])[0]
+            if left_pointer <= 0: #-1, or 0 padding in files written before left links
+                node.left = None
+            else:
+                node.left = left_pointer
         else:
             children = []
             for i in range(m+1): #internal nodes
@@ -90,37 +108,117 @@ class bptreenode:
         return node
 
 class bptree:
-    def __init__(self, filename, b= None, create_new=False):
+    def __init__(self, filename, b= None, create_new=False, nodesize=4096, key_format="i"):
         self.filename = filename
-        self.nodesize = 4096
+        self.nodesize = nodesize
+        self.dirty = False #header fields changed since the last flush
         if create_new == True:
+            #checked before the file is opened "wb", so a bad argument leaves an existing file alone
+            if key_format not in KEY_FORMATS:
+                raise ValueError(f"key format must be one of {KEY_FORMATS}, not {key_format!r}")
+            if b is None or b < 3 or node_size(b, key_format) > nodesize:
+                raise ValueError(f"b={b} does not fit a {nodesize}-byte page with key format {key_format!r}")
             self.b = b
+            self.root_offset = self.nodesize
+            self.height = 1
+            self.count = 0
+            self.free_head = -1
+            self.fmt = key_format #"q" for 64-bit keys and values
             with open(filename, "wb") as f:
-                f.write(struct.pack("ii", b, self.nodesize)) #two int val
-                f.write(b'\x00'*(self.nodesize-8)) #4088 bytes
+                f.write(self.header())
                 root = bptreenode(True,b)
-                f.write(root.byte_to_dat().ljust(self.nodesize,b'\x00'))
-            self.root_offset = self.nodesize
+                f.write(root.byte_to_dat(self.fmt).ljust(self.nodesize,b'\x00'))
         else:
-            with open(filename, "rb") as f:
-                self.b, self.root_offset = struct.unpack("ii", f.read(8))
+            with open(filename, "rb") as f: #only header read for the lifetime of the tree
+                self.b, self.root_offset, nodesize, self.height, self.count, self.free_head, fmt = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+            self.fmt = KEY_FORMATS[fmt]
+            if nodesize == 0: #old header with only b and root offset, upgraded on the next flush
+                self.free_head = -1
+                self.height, self.count = self.measure()
+                self.dirty = True
+            else:
+                self.nodesize = nodesize
+
+    def header(self): #first page of the .dat file
+        return struct.pack(HEADER_FORMAT, self.b, self.root_offset, self.nodesize, self.height, self.count, self.free_head, KEY_FORMATS.index(self.fmt)).ljust(self.nodesize, b'\x00')
+
+    def measure(self): #height and entry count by walking the tree, for old headers
+        #leaves written before left links read back with left=None; the walk along the right chain
+        #puts them back, straight into the file (membptree loads its pages after this)
+        height = 1
+        offset = self.root_offset
+        node = self.read(offset)
+        while not node.is_leaf:
+            offset = node.children[0]
+            node = self.read(offset)
+            height += 1
+        count = len(node.keys)
+        while node.right is not None:
+            prev = offset
+            offset = node.right
+            node = self.read(offset)
+            if node.left != prev:
+                node.left = prev
+                bptree.write(self, node, offset)
+            count += len(node.keys)
+        return height, count
+
+    def save_header(self): #root offset and free-list head reach the file as soon as they change
+        with open(self.filename, "r+b") as f:
+            f.write(self.header())
+        self.dirty = False
+
+    def flush(self): #entry count and height are only written back lazily, here
+        if not self.dirty:
+            return
+        self.save_header()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
             
     def read(self, offset):
         with open(self.filename, "rb") as f:
             f.seek(offset)
             data = f.read(self.nodesize)
-            return bptreenode.dat_to_byte(data, self.b)
+            return bptreenode.dat_to_byte(data, self.b, self.fmt)
         
     def write(self, node, offset):
         with open(self.filename, "r+b") as f:
             f.seek(offset)
-            f.write(node.byte_to_dat().ljust(self.nodesize,b'\x00')) 
+            f.write(node.byte_to_dat(self.fmt).ljust(self.nodesize,b'\x00')) 
             
     def allocate(self, node):
+        if self.free_head != -1: #reuse a freed page first
+            offset = self.free_head
+            self.free_head = self.next_free(offset)
+            self.save_header() #page leaves the free list on disk before it is overwritten
+            self.write(node, offset)
+            return offset
         with open(self.filename, "ab") as f:
             offset = f.tell()
-            f.write(node.byte_to_dat().ljust(self.nodesize, b'\x00'))
+            f.write(node.byte_to_dat(self.fmt).ljust(self.nodesize, b'\x00'))
         return offset
+
+    def free(self, offset): #push a page that is no longer referenced onto the free list
+        with open(self.filename, "r+b") as f:
+            f.seek(offset)
+            f.write(self.free_page(self.free_head))
+        self.free_head = offset
+        self.save_header()
+
+    def next_free(self, offset):
+        with open(self.filename, "rb") as f:
+            f.seek(offset+1)
+            return struct.unpack("i", f.read(4))[0]
+
+    def free_page(self, next_offset):
+        return (bytes([FREE_PAGE]) + struct.pack("i", next_offset)).ljust(self.nodesize, b'\x00')
     
     def search(self, key):
         node, _ = self.search_recursive(self.root_offset, key, print_path=True) 
@@ -149,17 +247,52 @@ class bptree:
             return node, offset
         return self.search_recursive(node.children[child_index], key, print_path)
    
-    def ranged_search(self, start_key, end_key):
-        node, _ = self.search_recursive(self.root_offset, start_key) #add 주석
+    def ranged_search(self, start_key, end_key, limit=None):
+        for k, v in self.scan_asc(start_key, end_key, limit):
+            print(f"{k}, {v}")
+
+    def ranged_search_desc(self, end_key, start_key, limit=None):
+        for k, v in self.scan_desc(end_key, start_key, limit):
+            print(f"{k}, {v}")
+
+    def scan_asc(self, lo, hi, limit=None): #yields (key, value) for lo <= key <= hi, smallest first
+        if limit is not None and limit <= 0:
+            return
+        count = 0
+        node, _ = self.search_recursive(self.root_offset, lo) #leaf that would hold lo
         while node:
             for i, k in enumerate(node.keys):
-                if start_key <= k <= end_key:
-                    print(f"{k}, {node.values[i]}")
-                elif k > end_key:
+                if k < lo:
+                    continue
+                if k > hi:
+                    return
+                yield k, node.values[i]
+                count += 1
+                if limit is not None and count >= limit: #stop before reading the next page
                     return
             if node.right is None:
                 break
             node = self.read(node.right)
+
+    def scan_desc(self, hi, lo, limit=None): #yields (key, value) for hi >= key >= lo, largest first
+        if limit is not None and limit <= 0:
+            return
+        count = 0
+        node, _ = self.search_recursive(self.root_offset, hi) #leaf that would hold hi
+        while node:
+            for i in range(len(node.keys)-1, -1, -1):
+                k = node.keys[i]
+                if k > hi:
+                    continue
+                if k < lo:
+                    return
+                yield k, node.values[i]
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+            if node.left is None:
+                break
+            node = self.read(node.left)
     
     def insert(self, key, value):
         root = self.read(self.root_offset)
@@ -169,18 +302,17 @@ class bptree:
             new_root = bptreenode(False, self.b)
             new_root.keys = [key_up]
             new_root.children = [left_offset,right_offset]
-            new_root_offset = self.allocate(new_root)
+            new_root_offset = self.allocate(new_root) #page is written before the header points at it
             self.root_offset = new_root_offset
-
-            with open(self.filename, "r+b") as f:
-                f.seek(4)
-                f.write(struct.pack("i", new_root_offset))
-            self.write(new_root, new_root_offset)
+            self.height += 1
+            self.save_header()
    
     def insert_recursive(self,node,key,value,offset):
         if node.is_leaf:
             if key in node.keys:
                 return None #duplicate
+            self.count += 1
+            self.dirty = True
             index = bisect.bisect_left(node.keys, key)
             node.keys.insert(index, key)
             node.values.insert(index,value)
@@ -217,11 +349,16 @@ class bptree:
         right_node.keys = node.keys[middle:]
         right_node.values = node.values[middle:]
         right_node.right = node.right
+        right_node.left = offset
 
         node.keys = node.keys[:middle]
         node.values = node.values[:middle]
 
         right_offset = self.allocate(right_node)
+        if node.right is not None: #old right neighbour now points back to the new node
+            next_node = self.read(node.right)
+            next_node.left = right_offset
+            self.write(next_node, node.right)
         node.right = right_offset
         self.write(node,offset)
         self.write(right_node,right_offset)
@@ -246,17 +383,21 @@ class bptree:
         return node, offset, key_up, right_node, right_offset
    
     def minimum_keys(self):
-        return math.ceil((self.b-1)/2) #min number of keys requrired for non-root nodes
+        return self.b//2 #ceil((b-1)/2), min number of keys requrired for non-root nodes
 
     def delete(self,key): #rebalances
         delete = self.delete_recursive(self.root_offset,key, None,-1)    
+        if delete:
+            self.count -= 1
+            self.dirty = True
         
         root = self.read(self.root_offset)
         if not root.is_leaf and len(root.keys) == 0 and len(root.children) > 0:
+            old_root_offset = self.root_offset
             self.root_offset = root.children[0] #root is empty
-            with open(self.filename, "r+b") as f:
-                f.seek(4)
-                f.write(struct.pack("i", self.root_offset))
+            self.height -= 1
+            self.save_header() #old root is only freed once the file no longer points at it
+            self.free(old_root_offset)
         return delete
     
     def delete_recursive(self, offset, key, parent_offset, child_index):
@@ -268,11 +409,7 @@ class bptree:
             node.keys.pop(index)
             node.values.pop(index)
             self.write(node, offset)
-            
-            if parent_offset is not None and len(node.keys) < self.minimum_keys(): #check if need to rebalance
-                parent = self.read(parent_offset)
-                self.rebalance_leaf(node, offset, parent, parent_offset, child_index)
-            return True
+            return True #parent rebalances, so no one reads this page after a merge frees it
         else:
             target_child_index = 0
             for i, k in enumerate(node.keys):
@@ -287,8 +424,11 @@ class bptree:
                 return False
             
             child = self.read(child_offset) #check if need to rebalance
-            if not child.is_leaf and len(child.keys) < self.minimum_keys():
-                self.rebalance_internal(child, child_offset, node, offset, target_child_index)
+            if len(child.keys) < self.minimum_keys():
+                if child.is_leaf:
+                    self.rebalance_leaf(child, child_offset, node, offset, target_child_index)
+                else:
+                    self.rebalance_internal(child, child_offset, node, offset, target_child_index)
             return True
         
     def rebalance_leaf(self, node,offset, parent, parent_offset, child_index):
@@ -383,12 +523,17 @@ class bptree:
         left.keys.extend(right.keys) #merge right->left
         left.values.extend(right.values)
         left.right = right.right
+        if right.right is not None: #unlink right from the left-sibling chain
+            next_node = self.read(right.right)
+            next_node.left = left_offset
+            self.write(next_node, right.right)
 
         parent.keys.pop(separate_index) #remove sep & right child from parent
         parent.children.pop(separate_index+1)
         
         self.write(left, left_offset)
         self.write(parent,parent_offset)
+        self.free(right_offset)
         
     def merge_internal(self, left, left_offset, right, right_offset, parent, parent_offset, separate_index):
         separate = parent.keys[separate_index]
@@ -401,43 +546,143 @@ class bptree:
         
         self.write(left, left_offset)
         self.write(parent,parent_offset)
+        self.free(right_offset)
+
+
+
+class membptree(bptree): #whole tree kept in memory as nodes, written back as a snapshot in the same page format
+    def __init__(self, filename, b=None, create_new=False, snapshot_every=None, key_format="i"):
+        self.nodes = {} #offset -> bptreenode
+        self.free_next = {} #offset of a free page -> next free page
+        bptree.__init__(self, filename, b, create_new, key_format=key_format)
+        self.snapshot_every = snapshot_every #take a snapshot every N insert/delete calls (None = only on demand/close)
+        self.ops = 0
+        with open(filename, "rb") as f:
+            data = f.read()
+        self.end_offset = self.nodesize
+        while self.end_offset + self.nodesize <= len(data):
+            page = data[self.end_offset:self.end_offset+self.nodesize]
+            if page[0] == FREE_PAGE:
+                self.free_next[self.end_offset] = struct.unpack("i", page[1:5])[0]
+            else:
+                self.nodes[self.end_offset] = bptreenode.dat_to_byte(page, self.b, self.fmt)
+            self.end_offset += self.nodesize
+
+    def read(self, offset):
+        node = self.nodes.get(offset)
+        if node is None: #pages not loaded yet (bptree.__init__ measuring an old header)
+            return bptree.read(self, offset)
+        return node
+
+    def write(self, node, offset):
+        self.nodes[offset] = node
+
+    def allocate(self, node):
+        if self.free_head != -1:
+            return bptree.allocate(self, node)
+        offset = self.end_offset #same offsets the file would have handed out
+        self.nodes[offset] = node
+        self.end_offset += self.nodesize
+        return offset
+
+    def free(self, offset):
+        del self.nodes[offset]
+        self.free_next[offset] = self.free_head
+        self.free_head = offset
+        self.dirty = True
+
+    def save_header(self): #header and pages only reach the file together, in snapshot()
+        self.dirty = True
+
+    def next_free(self, offset):
+        return self.free_next.pop(offset)
+
+    def insert(self, key, value):
+        bptree.insert(self, key, value)
+        self.tick()
+
+    def delete(self, key):
+        delete = bptree.delete(self, key)
+        self.tick()
+        return delete
+
+    def tick(self):
+        self.ops += 1
+        if self.snapshot_every and self.ops % self.snapshot_every == 0:
+            self.snapshot()
+
+    def snapshot(self): #write to a temp file, then rename over the .dat file
+        tmp = self.filename + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.header())
+            for offset in range(self.nodesize, self.end_offset, self.nodesize):
+                if offset in self.free_next:
+                    f.write(self.free_page(self.free_next[offset]))
+                else:
+                    f.write(self.nodes[offset].byte_to_dat(self.fmt).ljust(self.nodesize, b'\x00'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.filename)
+        self.dirty = False
+
+    def flush(self): #header and pages only reach the file together; an unchanged tree leaves the file alone
+        if not self.dirty:
+            return
+        self.snapshot()
 
    
 #main
 def main():
     args = sys.argv
 
-    if args[1] == "-c": #create file             -c index_file b
+    if args[1] == "-c": #create file             -c index_file b [q]
         index_file = args[2] 
         b = int(args[3]) 
-        bptree(index_file, b, create_new=True) #overwrite 
+        key_format = args[4] if len(args) > 4 else "i" #q: 64-bit keys and values
+        bptree(index_file, b, create_new=True, key_format=key_format) #overwrite 
 
     elif args[1] == "-i": #insert                -i index_file data_file
         tree = bptree(args[2])
-        with open(args[3], "r") as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    key, value = map(int, line.split(","))
-                    tree.insert(key, value)
+        try:
+            with open(args[3], "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        key, value = map(int, line.split(","))
+                        tree.insert(key, value)
+        finally:
+            tree.close() #only entry count and height wait for this; root offset and free list are already in the header
 
     elif args[1] == "-d": #delete                -d index_file data_file
         tree = bptree(args[2])
-        with open(args[3], "r") as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    key = int(line)
-                    tree.delete(key)
+        try:
+            with open(args[3], "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        key = int(line)
+                        tree.delete(key)
+        finally:
+            tree.close()
     elif args[1] == "-s": #single_key search     -s index_file key
         tree = bptree(args[2])
         key = int(args[3])
         tree.search(key)
-    elif args[1] == "-r": #ranged search         -r index_file start_key end_key
+        tree.close()
+    elif args[1] == "-r": #ranged search         -r index_file start_key end_key [limit]
         tree = bptree(args[2])
         start_key = int(args[3])
         end_key = int(args[4])
-        tree.ranged_search(start_key, end_key)
+        limit = int(args[5]) if len(args) > 5 else None
+        tree.ranged_search(start_key, end_key, limit)
+        tree.close()
+    elif args[1] == "-rd": #reverse ranged search -rd index_file end_key start_key [limit]
+        tree = bptree(args[2])
+        end_key = int(args[3])
+        start_key = int(args[4])
+        limit = int(args[5]) if len(args) > 5 else None
+        tree.ranged_search_desc(end_key, start_key, limit)
+        tree.close()
     else:
         print("unknown command")
 
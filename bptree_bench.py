@@ -0,0 +1,60 @@
+import sys
+import os
+import time
+import random
+import subprocess
+import statistics
+
+from bptree import bptree, membptree
+
+BPTREE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bptree.py")
+
+def build(filename, n, b): #random keys, built in memory and snapshotted once
+    tree = membptree(filename, b, create_new=True)
+    keys = random.sample(range(n*10), n)
+    for k in keys:
+        tree.insert(k, k)
+    tree.close()
+    return keys
+
+def run_cli(args): #wall time of one short CLI invocation, in ms
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, check=True)
+    return (time.perf_counter()-start)*1000
+
+def report(name, samples):
+    samples = sorted(samples)
+    p50 = samples[len(samples)//2]
+    p99 = samples[min(len(samples)-1, int(len(samples)*0.99))]
+    print(f"{name:<28} mean {statistics.mean(samples):8.3f} ms   p50 {p50:8.3f} ms   p99 {p99:8.3f} ms")
+
+def startup(filename, n, b, runs): #python bptree.py -s against one index, many times
+    keys = build(filename, n, b)
+    tree = bptree(filename)
+    print(f"index: {n} keys, b={b}, height {tree.height}, {os.path.getsize(filename)//tree.nodesize} pages")
+
+    report("python -c pass", [run_cli(["-c", "pass"]) for _ in range(runs)]) #interpreter floor
+    report("bptree.py -s", [run_cli([BPTREE, "-s", filename, str(random.choice(keys))]) for _ in range(runs)])
+
+    samples = []
+    for _ in range(runs*10):
+        start = time.perf_counter()
+        bptree(filename)
+        samples.append((time.perf_counter()-start)*1000)
+    report("bptree() open", samples)
+
+#main
+def main():
+    args = sys.argv
+
+    if len(args) > 1 and args[1] == "startup": #startup [index_file] [n] [b] [runs]
+        filename = args[2] if len(args) > 2 else "bench.dat"
+        n = int(args[3]) if len(args) > 3 else 100000
+        b = int(args[4]) if len(args) > 4 else 64
+        runs = int(args[5]) if len(args) > 5 else 30
+        startup(filename, n, b, runs)
+    else:
+        print("usage: python bptree_bench.py startup [index_file] [n] [b] [runs]")
+
+if __name__ == "__main__":
+    main()
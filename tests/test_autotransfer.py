@@ -0,0 +1,40 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bank_app"))
+pytest.importorskip("pymysql") #autotransfer imports bank
+from autotransfer import add_months, next_transfer_date
+
+def schedule(start, frequency, n, day):
+    dates = []
+    d = start
+    for _ in range(n):
+        d = next_transfer_date(d, frequency, day)
+        dates.append(d.date().isoformat())
+    return dates
+
+def test_month_end_returns_to_anchor_day():
+    assert schedule(datetime(2025, 1, 31, 9, 30), "monthly", 4, 31) == ["2025-02-28", "2025-03-31", "2025-04-30", "2025-05-31"]
+    assert schedule(datetime(2024, 1, 31), "Monthly ", 2, 31) == ["2024-02-29", "2024-03-31"]
+
+def test_quarterly_from_the_30th():
+    assert schedule(datetime(2024, 11, 30), "quarterly", 3, 30) == ["2025-02-28", "2025-05-30", "2025-08-30"]
+
+def test_leap_day_yearly():
+    assert schedule(datetime(2024, 2, 29), "yearly", 4, 29) == ["2025-02-28", "2026-02-28", "2027-02-28", "2028-02-29"]
+
+def test_without_anchor_day_clamps_from_the_date():
+    assert add_months(datetime(2025, 1, 31), 1) == datetime(2025, 2, 28)
+    assert add_months(datetime(2025, 2, 28), 1) == datetime(2025, 3, 28)
+    assert add_months(datetime(2025, 11, 15, 8), 2) == datetime(2026, 1, 15, 8)
+
+def test_daily_and_weekly_ignore_anchor_day():
+    assert schedule(datetime(2025, 2, 27), "daily", 2, 31) == ["2025-02-28", "2025-03-01"]
+    assert schedule(datetime(2025, 2, 27), "weekly", 1, 31) == ["2025-03-06"]
+
+def test_unknown_frequency():
+    with pytest.raises(Exception):
+        next_transfer_date(datetime(2025, 1, 1), "fortnightly")
@@ -0,0 +1,180 @@
+import os
+import sys
+import random
+import struct
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bptree import bptree, membptree
+
+def keys_of(tree):
+    return [k for k, _ in tree.scan_asc(-2**31, 2**31-1)]
+
+# ------------------------------------------------------------
+# header
+# ------------------------------------------------------------
+def test_root_survives_without_close(tmp_path):
+    path = str(tmp_path / "t.dat")
+    tree = bptree(path, 4, create_new=True)
+    for k in range(200):
+        tree.insert(k, k*10)
+    #no close(): root offset must already be on disk
+    reopened = bptree(path)
+    assert reopened.root_offset == tree.root_offset
+    assert keys_of(reopened) == list(range(200))
+    assert [k for k, _ in reopened.scan_desc(199, 0)] == list(range(199, -1, -1))
+
+def test_root_collapse_without_close(tmp_path):
+    path = str(tmp_path / "t.dat")
+    tree = bptree(path, 4, create_new=True)
+    for k in range(200):
+        tree.insert(k, k)
+    height = tree.height
+    for k in range(195):
+        tree.delete(k)
+    assert tree.height < height
+    reopened = bptree(path) #the old root page is freed, the file must not point at it
+    assert keys_of(reopened) == list(range(195, 200))
+
+def test_count_and_height_written_on_close(tmp_path):
+    path = str(tmp_path / "t.dat")
+    with bptree(path, 5, create_new=True) as tree:
+        for k in random.sample(range(1000), 300):
+            tree.insert(k, k)
+        for k in range(0, 1000, 3):
+            tree.delete(k)
+        count, height = tree.count, tree.height
+    reopened = bptree(path)
+    assert (reopened.count, reopened.height) == (count, height)
+    assert reopened.measure() == (count, height)[::-1]
+
+def test_freed_pages_reused(tmp_path):
+    path = str(tmp_path / "t.dat")
+    with bptree(path, 4, create_new=True) as tree:
+        for k in range(300):
+            tree.insert(k, k)
+        for k in range(300):
+            tree.delete(k)
+        size = os.path.getsize(path)
+        for k in range(300):
+            tree.insert(k, k)
+    assert os.path.getsize(path) == size
+    assert keys_of(bptree(path)) == list(range(300))
+
+# ------------------------------------------------------------
+# scans
+# ------------------------------------------------------------
+def legacy_copy(path): #rewrite a tree file in the layout from before the extended header and left links
+    with open(path, "r+b") as f:
+        data = bytearray(f.read())
+        nodesize = struct.unpack("iii", data[:12])[2]
+        b, root = struct.unpack("ii", data[:8])
+        data[:nodesize] = struct.pack("ii", b, root).ljust(nodesize, b"\x00")
+        for page in range(nodesize, len(data), nodesize):
+            if data[page] == 1:
+                m = struct.unpack("i", data[page+1:page+5])[0]
+                left = page + 1 + 4 + m*8 + 4
+                data[left:left+4] = b"\x00"*4
+        f.seek(0)
+        f.write(data)
+
+def test_scans_with_limit(tmp_path):
+    path = str(tmp_path / "t.dat")
+    with bptree(path, 4, create_new=True) as tree:
+        keys = random.sample(range(10000), 500)
+        for k in keys:
+            tree.insert(k, k+1)
+        keys.sort()
+        lo, hi = keys[100], keys[400]
+        inside = [k for k in keys if lo <= k <= hi]
+        assert [k for k, _ in tree.scan_asc(lo, hi)] == inside
+        assert [k for k, _ in tree.scan_desc(hi, lo)] == inside[::-1]
+        assert [k for k, _ in tree.scan_asc(lo, hi, 7)] == inside[:7]
+        assert [k for k, _ in tree.scan_desc(hi, lo, 7)] == inside[::-1][:7]
+        assert list(tree.scan_desc(hi, lo, 0)) == []
+
+def test_reverse_scan_on_legacy_file(tmp_path):
+    path = str(tmp_path / "old.dat")
+    with bptree(path, 4, create_new=True) as tree:
+        for k in range(1100):
+            tree.insert(k, k)
+    legacy_copy(path)
+
+    tree = bptree(path) #old header: measured, left links rebuilt
+    assert (tree.height, tree.count) == tree.measure()
+    assert [k for k, _ in tree.scan_desc(10000, 0)] == list(range(1099, -1, -1))
+    tree.close()
+    assert [k for k, _ in bptree(path).scan_desc(10000, 0)] == list(range(1099, -1, -1))
+
+def test_reverse_scan_on_legacy_file_in_memory(tmp_path):
+    path = str(tmp_path / "old.dat")
+    with bptree(path, 4, create_new=True) as tree:
+        for k in range(300):
+            tree.insert(k, k)
+    legacy_copy(path)
+    assert [k for k, _ in membptree(path).scan_desc(299, 0, 50)] == list(range(299, 249, -1))
+
+# ------------------------------------------------------------
+# membptree
+# ------------------------------------------------------------
+def test_membptree_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "m.dat")
+    bptree(path, 5, create_new=True).close()
+    tree = membptree(path)
+    keys = set(random.sample(range(100000), 2000))
+    for k in keys:
+        tree.insert(k, k*2)
+    for k in random.sample(sorted(keys), 700):
+        tree.delete(k)
+        keys.discard(k)
+    assert keys_of(bptree(path)) == [] #nothing reaches the file before a snapshot
+    tree.close()
+
+    reopened = bptree(path)
+    assert list(reopened.scan_asc(-2**31, 2**31-1)) == [(k, k*2) for k in sorted(keys)]
+    assert reopened.count == len(keys)
+    assert [k for k, _ in membptree(path).scan_desc(2**31-1, -2**31)] == sorted(keys, reverse=True)
+
+def test_membptree_close_without_changes(tmp_path):
+    path = str(tmp_path / "m.dat")
+    bptree(path, 4, create_new=True).close()
+    reader = membptree(path)
+    writer = membptree(path)
+    for k in range(100):
+        writer.insert(k, k)
+    writer.close()
+    reader.close() #unchanged: must not put its stale copy back
+    assert keys_of(bptree(path)) == list(range(100))
+
+def test_membptree_snapshot_every(tmp_path):
+    path = str(tmp_path / "m.dat")
+    bptree(path, 4, create_new=True).close()
+    tree = membptree(path, snapshot_every=10)
+    for k in range(25):
+        tree.insert(k, k)
+    assert keys_of(bptree(path)) == list(range(20)) #last snapshot after the 20th insert
+
+# ------------------------------------------------------------
+# 64-bit keys
+# ------------------------------------------------------------
+def test_q_key_format(tmp_path):
+    path = str(tmp_path / "q.dat")
+    big = [(1 << 40) + i*(1 << 33) for i in range(300)]
+    with bptree(path, 16, create_new=True, key_format="q") as tree:
+        for i, k in enumerate(big):
+            tree.insert(k, -k)
+    reopened = bptree(path) #key format comes from the header
+    assert reopened.fmt == "q"
+    assert list(reopened.scan_asc(-2**63, 2**63-1)) == [(k, -k) for k in big]
+    assert [k for k, _ in reopened.scan_desc(big[-1], big[0], 5)] == big[::-1][:5]
+
+def test_bad_arguments_leave_the_file_alone(tmp_path):
+    path = str(tmp_path / "q.dat")
+    with bptree(path, 4, create_new=True) as tree:
+        tree.insert(1, 1)
+    for b, key_format in [(4, "x"), (257, "q"), (512, "i"), (2, "i")]:
+        with pytest.raises(ValueError):
+            bptree(path, b, create_new=True, key_format=key_format)
+    assert keys_of(bptree(path)) == [1]
+    bptree(path, 256, create_new=True, key_format="q").close() #a full leaf of 255 8-byte pairs still fits one page
@@ -0,0 +1,74 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bank_app"))
+import cache
+from cache import ResultCache
+
+def loader(value, calls):
+    def load():
+        calls.append(1)
+        return value
+    return load
+
+def fill(c):
+    c.get_or_load(("accounts", 1), lambda: [{"AccountID": 10}, {"AccountID": 11}], ("AccountID",))
+    c.get_or_load(("transactions", 1), lambda: [{"SourceAccountID": 10, "RecipientAccountID": 20}],
+                  ("SourceAccountID", "RecipientAccountID"))
+    c.get_or_load(("accounts", 2), lambda: [{"AccountID": 20}], ("AccountID",))
+
+def test_hit_after_load():
+    c = ResultCache()
+    calls = []
+    assert c.get_or_load(("name", 1), loader("Kim", calls)) == "Kim"
+    assert c.get_or_load(("name", 1), loader("Lee", calls)) == "Kim"
+    assert len(calls) == 1 and c.stats()["hits"] == 1
+
+def test_invalidate_account_drops_every_list_showing_it():
+    c = ResultCache()
+    fill(c)
+    c.invalidate_account(10)
+    assert set(c.entries) == {("accounts", 2)}
+    assert 10 not in c.links and c.links[20] == {("accounts", 2)}
+
+def test_invalidate_account_of_one_kind():
+    c = ResultCache()
+    fill(c)
+    c.invalidate_account(20, "accounts")
+    assert set(c.entries) == {("accounts", 1), ("transactions", 1)}
+    c.invalidate_account(11, "transactions") #account 11 is only in an accounts list
+    assert set(c.entries) == {("accounts", 1), ("transactions", 1)}
+
+def test_load_racing_an_invalidation_is_not_cached():
+    c = ResultCache()
+    calls = []
+    def stale_load(): #a write commits and invalidates while this read is in flight
+        calls.append(1)
+        c.invalidate(("accounts", 1))
+        return [{"AccountID": 10, "Balance": 0}]
+    assert c.get_or_load(("accounts", 1), stale_load, ("AccountID",)) == [{"AccountID": 10, "Balance": 0}]
+    assert ("accounts", 1) not in c.entries and c.links == {}
+    c.get_or_load(("accounts", 1), loader([{"AccountID": 10, "Balance": 5}], calls), ("AccountID",))
+    assert len(calls) == 2 and ("accounts", 1) in c.entries
+
+def test_least_recently_used_is_evicted_first():
+    c = ResultCache(maxsize=2)
+    c.get_or_load("a", lambda: [{"AccountID": 1}], ("AccountID",))
+    c.get_or_load("b", lambda: 2)
+    c.get_or_load("a", lambda: None) #hit: "a" becomes most recent
+    c.get_or_load("c", lambda: 3)
+    assert list(c.entries) == ["a", "c"]
+    c.get_or_load("d", lambda: 4)
+    assert list(c.entries) == ["c", "d"] and c.links == {} and c.stats()["evictions"] == 2
+
+def test_expired_entry_is_loaded_again(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    c = ResultCache(ttl=60)
+    calls = []
+    c.get_or_load("k", loader([{"AccountID": 1}], calls), ("AccountID",))
+    now[0] += 59
+    c.get_or_load("k", loader([{"AccountID": 1}], calls), ("AccountID",))
+    now[0] += 2
+    assert c.get_or_load("k", loader([{"AccountID": 2}], calls), ("AccountID",)) == [{"AccountID": 2}]
+    assert len(calls) == 2 and set(c.links) == {2}
@@ -0,0 +1,184 @@
+import os
+import sys
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bank_app"))
+pytest.importorskip("pymysql") #every module below imports bank
+import bank
+import rollup
+import autotransfer
+import purge
+import ledger
+import search
+import export
+from bank import DB_CONFIG, CLOSED, connect
+from search import user_grams, prefix_query, substring_query
+
+# ------------------------------------------------------------
+# QUERIES
+# ------------------------------------------------------------
+#every SELECT/UPDATE/DELETE the app and batch modules run, taken from their module constants with sample arguments;
+#none of them may need a full scan of a base table. Names are "<module>.<CONSTANT> [variant]"
+NOW = datetime(2025, 1, 1)
+MODULES = [bank, rollup, autotransfer, purge, ledger, search, export] #bank first: the others import some of its constants
+
+QUERIES = [
+    ("bank.FIND_USER", bank.FIND_USER, ("a@b.c", "pw")),
+    ("bank.FIND_ADMIN", bank.FIND_ADMIN, ("a@b.c", "pw")),
+    ("bank.LOCK_OWNED_ACCOUNT", bank.LOCK_OWNED_ACCOUNT, (1, 1, CLOSED)),
+    ("bank.CLOSE_ACCOUNT", bank.CLOSE_ACCOUNT, (CLOSED, 1)),
+    ("bank.LOCK_ACCOUNT", bank.LOCK_ACCOUNT, (1,)),
+    ("bank.SET_BALANCE", bank.SET_BALANCE, (1, 1)),
+    ("bank.LOCK_TRANSFER_ACCOUNTS", bank.LOCK_TRANSFER_ACCOUNTS, (1, 2)),
+    ("bank.LOCK_ACCOUNTS", bank.LOCK_ACCOUNTS.format(marks="%s,%s,%s"), (1, 2, 3, CLOSED)),
+    ("bank.ACCOUNT_STATUS", bank.ACCOUNT_STATUS, (1,)),
+    ("bank.WITHDRAW_IF_FUNDED", bank.WITHDRAW_IF_FUNDED, (1, 1, 1, CLOSED)),
+    ("bank.DEPOSIT_IF_OPEN", bank.DEPOSIT_IF_OPEN, (1, 1, CLOSED)),
+    ("bank.SHARE_AUTOTRANSFER_ACCOUNTS", bank.SHARE_AUTOTRANSFER_ACCOUNTS, (1, 2)),
+    ("bank.USER_ACCOUNTS", bank.USER_ACCOUNTS, (1, CLOSED)),
+    ("bank.PAGE_ACCOUNTS", bank.PAGE_ACCOUNTS, (0, 100)),
+    ("bank.USER_TRANSACTIONS", bank.USER_TRANSACTIONS, (1, 1)),
+    ("bank.LATEST_TRANSACTIONS", bank.LATEST_TRANSACTIONS, (100,)),
+    ("bank.TRANSACTIONS_BEFORE", bank.TRANSACTIONS_BEFORE, (1000, 100)),
+    ("bank.USER_AUTOTRANSFERS", bank.USER_AUTOTRANSFERS, (1,)),
+    ("bank.PAGE_AUTOTRANSFERS", bank.PAGE_AUTOTRANSFERS, (0, 100)),
+    ("bank.ALL_TRANSACTIONS", bank.ALL_TRANSACTIONS, ()),
+    ("bank.ALL_ACCOUNTS", bank.ALL_ACCOUNTS, ()),
+    ("bank.ALL_AUTOTRANSFERS", bank.ALL_AUTOTRANSFERS, ()),
+    ("bank.USER_NAME", bank.USER_NAME, (1,)),
+    ("rollup.NET_CHANGE since", rollup.NET_CHANGE.format(bounds=" AND CreatedTime >= %s"), (1, NOW, 1, NOW)),
+    ("rollup.NET_CHANGE range", rollup.NET_CHANGE.format(bounds=" AND CreatedTime >= %s AND CreatedTime < %s"),
+     (1, NOW, NOW, 1, NOW, NOW)),
+    ("rollup.LOCK_WATERMARK", rollup.LOCK_WATERMARK, (rollup.WATERMARK,)),
+    ("rollup.NEW_ACCOUNTS", rollup.NEW_ACCOUNTS, (0, 1000)),
+    ("rollup.SET_SEEDED", rollup.SET_SEEDED, (0, rollup.WATERMARK)),
+    ("rollup.SNAPSHOT_BEFORE", rollup.SNAPSHOT_BEFORE, (1, NOW)),
+    ("rollup.LOCK_DAYS_FROM", rollup.LOCK_DAYS_FROM, (1, NOW)),
+    ("rollup.NEW_TRANSACTIONS", rollup.NEW_TRANSACTIONS, (0, 1000)),
+    ("rollup.OPEN_ACCOUNTS", rollup.OPEN_ACCOUNTS.format(marks="%s,%s,%s"), (1, 2, 3, CLOSED)),
+    ("rollup.SET_THROUGH", rollup.SET_THROUGH, (NOW, rollup.WATERMARK)),
+    ("rollup.SET_ROLLED", rollup.SET_ROLLED, (0, NOW, rollup.WATERMARK)),
+    ("rollup.ROLLED_THROUGH", rollup.ROLLED_THROUGH, (rollup.WATERMARK,)),
+    ("rollup.ACCOUNT_BALANCE", rollup.ACCOUNT_BALANCE, (1,)),
+    ("rollup.RECENT_TRANSACTIONS", rollup.RECENT_TRANSACTIONS, (1, NOW, NOW, 1, NOW, NOW)),
+    ("rollup.STATEMENT_DAYS", rollup.STATEMENT_DAYS, (1, NOW, NOW, NOW)),
+    ("autotransfer.FIRST_DUE", autotransfer.FIRST_DUE, (NOW, 200)),
+    ("autotransfer.DUE_AFTER", autotransfer.DUE_AFTER, (NOW, NOW, NOW, 0, 200)),
+    ("autotransfer.LOCK_DUE", autotransfer.LOCK_DUE.format(marks="%s,%s,%s"), (1, 2, 3, NOW)),
+    ("autotransfer.ADVANCE", autotransfer.ADVANCE, (NOW, 1)),
+    ("purge.CLOSED_ACCOUNTS", purge.CLOSED_ACCOUNTS, (CLOSED, 100)),
+    *[(f"purge.PURGE_CHUNK {table}.{column}", purge.PURGE_CHUNK.format(table=table, column=column, key=key), (1, 1000))
+      for table, key, column in purge.PURGE_STEPS],
+    ("purge.PURGE_ACCOUNT", purge.PURGE_ACCOUNT, (1, CLOSED)),
+    ("ledger.FETCH_NEW", ledger.FETCH_NEW, (0, 5000)),
+    ("search.REBUILD_PAGE", search.REBUILD_PAGE, (0, 1000)),
+    ("search.EXACT_EMAIL", search.EXACT_EMAIL, ("a@b.c",)),
+    ("search.prefix_query", *prefix_query("kim")),
+    ("search.substring_query", *substring_query("kimj")),
+    ("search.substring_query short words", *substring_query("li na")),
+    ("search.substring_query long and short words", *substring_query("kim na")),
+    *[(f"export.KEY_RANGE {table}", export.KEY_RANGE.format(table=table, key=key), ())
+      for table, key in export.EXPORTS.items()],
+    *[(f"export.EXPORT_RANGE {table}", export.EXPORT_RANGE.format(table=table, key=key), (1, 50000))
+      for table, key in export.EXPORTS.items()],
+]
+
+#(query name, table as EXPLAIN shows it, i.e. the alias) pairs that may read a whole base table: the stream_all_*
+#dumps read every row on purpose
+ALLOW_FULL_SCAN = {
+    ("bank.ALL_TRANSACTIONS", "transaction"),
+    ("bank.ALL_ACCOUNTS", "a"),
+    ("bank.ALL_AUTOTRANSFERS", "autotransfer"),
+}
+
+def sql_constants(): #{"<module>.<CONSTANT>"} for every SELECT/UPDATE/DELETE constant, under the module defining it
+    seen = set()
+    names = set()
+    for module in MODULES:
+        for name, value in vars(module).items():
+            if not name.isupper() or not isinstance(value, str) or id(value) in seen:
+                continue
+            seen.add(id(value))
+            if value.split()[:1] and value.split()[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+                names.add(f"{module.__name__}.{name}")
+    return names
+
+def test_every_query_is_checked(): #a new constant has to be added to QUERIES
+    checked = {name.split()[0] for name, _, _ in QUERIES}
+    assert sql_constants() - checked == set()
+
+def test_placeholders_match_arguments():
+    for name, sql, args in QUERIES:
+        assert sql.count("%s") == len(args), name
+
+# ------------------------------------------------------------
+# SEED ROWS
+# ------------------------------------------------------------
+#on nearly empty tables the optimizer picks a full scan whatever the indexes are, so plans are read with some
+#data in place: throwaway rows inserted in the transaction the EXPLAINs run in, rolled back afterwards
+SEED_USERS = 2000 #2 accounts, 10 transactions, 1 autotransfer and 20 daily balances per user
+
+def seed(cur, users):
+    rng = random.Random(0)
+    cur.executemany("INSERT INTO user (FName, LName, Email, Password) VALUES (%s, %s, %s, %s)",
+                    [(f"Seed{i}", f"User{i % 997}", f"seed-{i}@seed.invalid", "-") for i in range(users)])
+    cur.execute("SELECT UserID, FName, LName, Email FROM user WHERE Email LIKE %s", ("seed-%@seed.invalid",))
+    rows = cur.fetchall()
+    cur.executemany("INSERT IGNORE INTO user_ngram (Gram, UserID) VALUES (%s, %s)",
+                    [(g, r['UserID']) for r in rows for g in user_grams(r['FName'], r['LName'], r['Email'])])
+
+    cur.executemany("INSERT INTO account (UserID, Balance, Status) VALUES (%s, %s, %s)",
+                    [(r['UserID'], 1000, CLOSED if rng.random() < 0.05 else "Active") for r in rows for _ in range(2)])
+    cur.execute("""
+        SELECT a.AccountID FROM account a JOIN user u ON a.UserID = u.UserID WHERE u.Email LIKE %s
+    """, ("seed-%@seed.invalid",))
+    accounts = [r['AccountID'] for r in cur.fetchall()]
+
+    def when():
+        return NOW - timedelta(days=rng.randrange(60), seconds=rng.randrange(86400))
+
+    cur.executemany("""
+        INSERT INTO transaction (SourceAccountID, RecipientAccountID, Type, Amount, CreatedTime)
+        VALUES (%s, %s, 'Transfer', %s, %s)
+    """, [(rng.choice(accounts), rng.choice(accounts), 1, when()) for _ in range(len(accounts)*5)])
+    cur.executemany("""
+        INSERT INTO autotransfer (SourceAccountID, TargetAccountID, Amount, Frequency, TransferDate, DayOfMonth)
+        VALUES (%s, %s, %s, 'monthly', %s, 1)
+    """, [(rng.choice(accounts), rng.choice(accounts), 1, when()) for _ in range(users)])
+    cur.executemany("INSERT IGNORE INTO daily_balance (AccountID, Day, Balance) VALUES (%s, %s, %s)",
+                    [(a, (NOW - timedelta(days=d)).date(), 1000) for a in accounts for d in range(10)])
+
+# ------------------------------------------------------------
+# EXPLAIN
+# ------------------------------------------------------------
+def full_scans(cur, sql, args): #plan rows of type ALL on a base table; derived/union temp tables (<...>) are fine
+    cur.execute("EXPLAIN " + sql, args)
+    return [r for r in cur.fetchall() if r.get('type') == 'ALL' and not str(r.get('table') or '').startswith('<')]
+
+@pytest.fixture
+def conn():
+    if not DB_CONFIG.get("host"):
+        pytest.skip("no MySQL configured in bank.DB_CONFIG")
+    try:
+        conn = connect()
+    except Exception as e:
+        pytest.skip(f"MySQL not reachable: {e}")
+    yield conn
+    conn.close()
+
+def test_queries_use_an_index(conn):
+    failed = []
+    try:
+        with conn.cursor() as cur:
+            conn.begin()
+            seed(cur, SEED_USERS)
+            for name, sql, args in QUERIES:
+                bad = [r for r in full_scans(cur, sql, args) if (name, r['table']) not in ALLOW_FULL_SCAN]
+                if bad:
+                    failed.append(f"{name}: full scan of {', '.join(str(r['table']) for r in bad)}")
+    finally:
+        conn.rollback() #seed rows go away
+    assert failed == []
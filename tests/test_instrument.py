@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bank_app"))
+pymysql = pytest.importorskip("pymysql")
+from bank import streaming_cursor
+from instrument import QueryStats, TimedSSDictCursor, TimedSSCursor, instrumented, statement_key
+
+class Conn:
+    def __init__(self, cursorclass):
+        self.cursorclass = cursorclass
+
+def test_streams_on_an_instrumented_connection_are_timed():
+    conn = Conn(instrumented()["cursorclass"])
+    assert streaming_cursor(conn) is TimedSSDictCursor
+    assert streaming_cursor(conn, tuples=True) is TimedSSCursor
+
+def test_streams_on_a_plain_connection_are_not():
+    conn = Conn(pymysql.cursors.DictCursor)
+    assert streaming_cursor(conn) is pymysql.cursors.SSDictCursor
+    assert streaming_cursor(conn, tuples=True) is pymysql.cursors.SSCursor
+
+def test_statement_key_collapses_literals_and_lists():
+    assert statement_key("SELECT * FROM t WHERE a IN (%s, %s,%s) AND b='x''y' AND c=1.5") == \
+        "SELECT * FROM t WHERE a IN (?) AND b=? AND c=?"
+    assert statement_key("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')") == "INSERT INTO t (a, b) VALUES (?)"
+
+def test_slow_statements_are_logged_without_arguments(tmp_path):
+    log = tmp_path / "slow.log"
+    stats = QueryStats(slow_ms=10, slow_log=str(log))
+    stats.record("SELECT * FROM user WHERE Password=%s", 0.001)
+    stats.record("SELECT * FROM user WHERE Password=%s", 0.050, rows=1)
+    lines = log.read_text().splitlines()
+    assert len(lines) == 1 and lines[0].endswith("rows=1 SELECT * FROM user WHERE Password=?")
+    assert stats.slow == 1 and stats.snapshot()[0][1].calls == 2
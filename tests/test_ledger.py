@@ -0,0 +1,59 @@
+import os
+import sys
+from decimal import Decimal
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bank_app"))
+pytest.importorskip("pymysql") #ledger imports bank
+from ledger import LocalLedger
+
+def row(transaction_id, account_id):
+    return {"TransactionID": transaction_id, "SourceAccountID": account_id, "RecipientAccountID": None, "Type": "Deposit",
+            "Amount": Decimal("1.00"), "Description": None, "CreatedTime": datetime(2025, 1, 1)}
+
+class FakeCursor: #answers LocalLedger.fetch_new from a list
+    def __init__(self, rows):
+        self.rows = rows
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        pass
+    def execute(self, sql, args):
+        last, limit = args
+        self.result = [r for r in self.rows if r["TransactionID"] > last][:limit]
+    def fetchall(self):
+        return self.result
+
+class FakeConn:
+    def __init__(self, rows):
+        self.rows = rows
+    def cursor(self):
+        return FakeCursor(self.rows)
+    def rollback(self):
+        pass
+
+def ids(rows):
+    return [r["TransactionID"] for r in rows]
+
+def test_read_only_close_keeps_a_concurrent_sync(tmp_path):
+    path = str(tmp_path / "ledger")
+    rows = [row(i, 1 + i % 2) for i in range(1, 101)]
+    ledger = LocalLedger(path)
+    ledger.sync(FakeConn(rows[:50]))
+    ledger.close()
+
+    reader = LocalLedger(path, read_only=True)
+    writer = LocalLedger(path)
+    writer.sync(FakeConn(rows))
+    writer.close()
+    reader.close()
+
+    reopened = LocalLedger(path, read_only=True)
+    assert ids(reopened.history(1, limit=100)) == list(range(100, 0, -2))
+    reopened.close()
+
+def test_read_only_needs_an_index(tmp_path):
+    with pytest.raises(Exception):
+        LocalLedger(str(tmp_path / "none"), read_only=True)
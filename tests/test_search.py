@@ -0,0 +1,28 @@
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bank_app"))
+from search import grams, user_grams, substring_query
+
+def test_grams_skip_whitespace():
+    assert grams("Kim Jin") == {"kim", "jin"}
+    assert grams("a\tbcd") == {"bcd"}
+    assert grams("ab cd") == set()
+    assert user_grams("Li", "Na", "ln@x.io") == {"ln@", "n@x", "@x.", "x.i", ".io"}
+
+def test_short_words_use_prefix_candidates():
+    sql, args = substring_query("li na")
+    assert "user_ngram" not in sql and "LIKE %s AND UserID > %s" in sql
+    assert not any(a.startswith("%") for a in args if isinstance(a, str)) #no leading wildcard anywhere
+    assert args[-7:] == ("li%", "li%", "li%", "na%", "na%", "na%", 20)
+
+def test_long_words_use_trigrams():
+    sql, args = substring_query("kim na", limit=5, after_id=7)
+    assert "user_ngram" in sql
+    assert args == ("kim", 7, 1, "%kim%", "%kim%", "%kim%", "na%", "na%", "na%", 5)
+
+def test_placeholders_match_arguments():
+    for key in ["kimj", "li na", "kim na", "a b c", "50%_off"]:
+        sql, args = substring_query(key)
+        assert len(re.findall("%s", sql)) == len(args)